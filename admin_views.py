@@ -1,155 +1,99 @@
 from django.shortcuts import render, redirect
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
-from products.models import Category, Product, Order, OrderItem, Payment, Cart
+from django.utils.dateparse import parse_date
+from django.utils.http import url_has_allowed_host_and_scheme
+from datetime import datetime, time, timedelta
+from products.models import Category, Product, Order, OrderItem, Payment
+from products.dashboard import get_dashboard_stats
+from products.instrumentation import QueryCounter
+from products.fulfilment import TransitionError, transition_orders
+from products.pagination import paginate_keyset
+from products.search import get_search_backend, search_orders
 
 
 @staff_member_required
 def admin_dashboard(request):
     """Admin dashboard with statistics and quick actions"""
+    refresh = request.GET.get('refresh') == '1'
     
-    # Get date ranges
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    
-    # Order statistics
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status='Payment_Pending').count()
-    confirmed_orders = Order.objects.filter(status='Confirmed').count()
-    processing_orders = Order.objects.filter(status='Processing').count()
-    shipped_orders = Order.objects.filter(status='Shipped').count()
-    delivered_orders = Order.objects.filter(status='Delivered').count()
-    cancelled_orders = Order.objects.filter(status='Cancelled').count()
-    
-    # Recent orders (last 7 days)
-    recent_orders = Order.objects.filter(created_at__date__gte=week_ago).count()
-    
-    # Revenue statistics
-    total_revenue = Order.objects.filter(status__in=['Paid', 'Confirmed', 'Processing', 'Shipped', 'Delivered']).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    
-    monthly_revenue = Order.objects.filter(
-        created_at__date__gte=month_ago,
-        status__in=['Paid', 'Confirmed', 'Processing', 'Shipped', 'Delivered']
-    ).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    
-    # Product statistics
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(is_active=True).count()
-    featured_products = Product.objects.filter(is_featured=True).count()
-    low_stock_products = Product.objects.filter(stock__lt=10).count()
-    
-    # Category statistics
-    total_categories = Category.objects.count()
-    active_categories = Category.objects.filter(is_active=True).count()
-    
-    # Payment statistics
-    cod_orders = Payment.objects.filter(payment_method='COD').count()
-    online_payments = Payment.objects.filter(payment_method__in=['UPI', 'CARD', 'NETBANKING']).count()
-    pending_refunds = Payment.objects.filter(refund_status='Pending').count()
-    
-    # Recent orders for display
-    recent_orders_list = Order.objects.select_related('user').order_by('-created_at')[:10]
-    
-    # Top selling products
-    top_products = OrderItem.objects.values('product__name').annotate(
-        total_sold=Sum('quantity')
-    ).order_by('-total_sold')[:5]
-    
-    # User statistics
-    from django.contrib.auth.models import User
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    staff_users = User.objects.filter(is_staff=True).count()
-    recent_users = User.objects.filter(date_joined__date__gte=week_ago).count()
-    
-    # Top customers by order count
-    top_customers = User.objects.annotate(
-        order_count=Count('orders')
-    ).filter(order_count__gt=0).order_by('-order_count')[:5]
-    
-    # Top customers by spending (only from completed orders, not cancelled)
-    top_spenders = User.objects.annotate(
-        total_spent=Sum('orders__total_amount', filter=Q(orders__status__in=['Paid', 'Confirmed', 'Processing', 'Shipped', 'Delivered']))
-    ).filter(total_spent__gt=0).order_by('-total_spent')[:5]
+    with QueryCounter() as counter:
+        stats, from_cache = get_dashboard_stats(refresh=refresh)
     
     context = {
-        # Order stats
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'confirmed_orders': confirmed_orders,
-        'processing_orders': processing_orders,
-        'shipped_orders': shipped_orders,
-        'delivered_orders': delivered_orders,
-        'cancelled_orders': cancelled_orders,
-        'recent_orders': recent_orders,
-        
-        # Revenue stats
-        'total_revenue': total_revenue,
-        'monthly_revenue': monthly_revenue,
-        
-        # Product stats
-        'total_products': total_products,
-        'active_products': active_products,
-        'featured_products': featured_products,
-        'low_stock_products': low_stock_products,
-        
-        # Category stats
-        'total_categories': total_categories,
-        'active_categories': active_categories,
+        **stats,
         
-        # Payment stats
-        'cod_orders': cod_orders,
-        'online_payments': online_payments,
-        'pending_refunds': pending_refunds,
-        
-        # User stats
-        'total_users': total_users,
-        'active_users': active_users,
-        'staff_users': staff_users,
-        'recent_users': recent_users,
-        
-        # Lists
-        'recent_orders_list': recent_orders_list,
-        'top_products': top_products,
-        'top_customers': top_customers,
-        'top_spenders': top_spenders,
+        # Cost of producing the statistics, shown in the page footer
+        'stats_from_cache': from_cache,
+        'stats_query_count': counter.count,
+        'stats_time_ms': counter.elapsed * 1000,
     }
     
     return render(request, 'admin/dashboard.html', context)
 
 
+ADMIN_ORDERS_PER_PAGE = 50
+
+
+def _local_day_start(value, days=0):
+    """Parse a YYYY-MM-DD string into the aware start of that local day, moved by days"""
+    try:
+        day = parse_date(value) if value else None
+        if day is None:
+            return None
+        return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
+    except (ValueError, OverflowError):
+        # Impossible dates such as 2024-02-30 are ignored like malformed ones
+        return None
+
+
 @staff_member_required
 def admin_orders(request):
     """Admin orders management page"""
-    orders = Order.objects.select_related('user').order_by('-created_at')
+    item_count = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        count=Count('id')
+    ).values('count')
+    # Correlated subquery, so items are only counted for the rows on the page
+    orders = Order.objects.select_related('user').annotate(
+        item_count=Coalesce(Subquery(item_count), 0)
+    )
     
     # Filter by status
     status_filter = request.GET.get('status')
     if status_filter:
         orders = orders.filter(status=status_filter)
     
+    # Filter by date range, as plain ranges on created_at so indexes apply
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    start = _local_day_start(date_from)
+    if start:
+        orders = orders.filter(created_at__gte=start)
+    end = _local_day_start(date_to, days=1)
+    if end:
+        orders = orders.filter(created_at__lt=end)
+    
     # Search
     search = request.GET.get('search')
     if search:
-        orders = orders.filter(
-            Q(order_number__icontains=search) |
-            Q(user__username__icontains=search) |
-            Q(user__email__icontains=search) |
-            Q(shipping_name__icontains=search)
-        )
+        orders = search_orders(orders, search)
+    
+    page = paginate_keyset(
+        orders,
+        ('-created_at', '-id'),
+        cursor=request.GET.get('cursor'),
+        per_page=ADMIN_ORDERS_PER_PAGE,
+    )
     
     context = {
-        'orders': orders,
+        'orders': page,
+        'page': page,
         'status_filter': status_filter,
+        'date_from': date_from,
+        'date_to': date_to,
         'search': search,
     }
     
@@ -180,10 +124,7 @@ def admin_products(request):
     # Search
     search = request.GET.get('search')
     if search:
-        products = products.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search)
-        )
+        products = get_search_backend().filter(products, search)
     
     categories = Category.objects.filter(is_active=True)
     
@@ -232,17 +173,62 @@ def admin_payments(request):
 def update_order_status(request, order_id):
     """Update order status"""
     if request.method == 'POST':
-        order = Order.objects.get(id=order_id)
         new_status = request.POST.get('status')
         
-        if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            messages.success(request, f'Order {order.order_number} status updated to {new_status}')
-        else:
+        try:
+            result = transition_orders([order_id], new_status, changed_by=request.user)
+        except TransitionError:
             messages.error(request, 'Invalid status selected')
+            return redirect('admin_orders')
+        
+        if result:
+            messages.success(request, f'Order {result.updated[0]} status updated to {new_status}')
+        for order_ref, reason in result.failures.items():
+            messages.error(request, f'Order {order_ref}: {reason}')
     
-    return redirect('admin_orders')
+    return _redirect_back(request, 'admin_orders')
+
+
+# Failures listed individually after a bulk update; the rest are summarised
+BULK_FAILURES_SHOWN = 10
+
+
+@staff_member_required
+def bulk_update_order_status(request):
+    """Move many selected orders to a new status in one transaction"""
+    if request.method == 'POST':
+        new_status = request.POST.get('status')
+        order_ids = [int(pk) for pk in request.POST.getlist('order_ids') if pk.isdigit()]
+        
+        if not order_ids:
+            messages.error(request, 'Select at least one order')
+            return _redirect_back(request, 'admin_orders')
+        
+        try:
+            result = transition_orders(order_ids, new_status, changed_by=request.user,
+                                       note=request.POST.get('note', '')[:200])
+        except TransitionError as e:
+            messages.error(request, str(e))
+            return _redirect_back(request, 'admin_orders')
+        
+        if result:
+            messages.success(request, f'{len(result.updated)} order(s) moved to {new_status}')
+        failures = list(result.failures.items())
+        for order_ref, reason in failures[:BULK_FAILURES_SHOWN]:
+            messages.error(request, f'Order {order_ref}: {reason}')
+        if len(failures) > BULK_FAILURES_SHOWN:
+            messages.error(request, f'{len(failures) - BULK_FAILURES_SHOWN} more order(s) could not be updated')
+    
+    return _redirect_back(request, 'admin_orders')
+
+
+def _redirect_back(request, fallback):
+    """Redirect to the posted next URL when it is safe, else to fallback"""
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                                    require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect(fallback)
 
 
 @staff_member_required
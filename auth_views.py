@@ -11,7 +11,8 @@ from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseRedirect
+from products.mail import queue_mail
 import logging
 
 logger = logging.getLogger(__name__)
@@ -74,7 +75,8 @@ def login_view(request):
 def profile_view(request):
     """User profile view"""
     from django.db.models import Sum
-    from products.models import Order, Cart
+    from products.models import Order
+    from products.cart import get_cart_count
     
     # Calculate total amount spent (only from completed orders, not cancelled)
     total_spent = Order.objects.filter(
@@ -84,12 +86,7 @@ def profile_view(request):
         total=Sum('total_amount')
     )['total'] or 0
     
-    # Get cart items count safely
-    try:
-        cart = Cart.objects.get(user=request.user)
-        cart_items_count = cart.total_items
-    except Cart.DoesNotExist:
-        cart_items_count = 0
+    cart_items_count = get_cart_count(request)
     
     context = {
         'user': request.user,
@@ -120,25 +117,14 @@ class CustomPasswordResetView(PasswordResetView):
                 f'/reset-password/{uid}/{token}/'
             )
             
-            # Always send HTML email (both development and production)
-            from django.template.loader import render_to_string
-            from django.core.mail import EmailMultiAlternatives
-            
             # Render HTML email
             html_content = render_to_string('auth/password_reset_email.html', {
                 'reset_link': reset_link,
                 'user': user,
             })
             
-            # Create email
-            subject = 'Password Reset - D&D Salon'
-            from_email = settings.DEFAULT_FROM_EMAIL
-            to_email = [email]
-            
-            # Send HTML email only (no plain text)
-            msg = EmailMultiAlternatives(subject, html_content, from_email, to_email)
-            msg.content_subtype = "html"
-            msg.send()
+            # Queue the HTML email; the send_queued_mail worker delivers it
+            queue_mail('Password Reset - D&D Salon', html_content, [email], html=True)
             
             if settings.DEBUG:
                 logger.info(f"Password reset link for {email}: {reset_link}")
@@ -150,7 +136,9 @@ class CustomPasswordResetView(PasswordResetView):
             messages.error(self.request, 'No account found with this email address.')
             return self.form_invalid(form)
         
-        return super().form_valid(form)
+        # Skip PasswordResetView.form_valid, which would send a second
+        # email synchronously through PasswordResetForm.save()
+        return HttpResponseRedirect(self.get_success_url())
 
 class CustomPasswordResetDoneView(PasswordResetDoneView):
     template_name = 'auth/password_reset_done.html'
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'products.instrumentation.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -39,7 +40,8 @@ ROOT_URLCONF = 'dd_salon.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing for QueryBudgetMiddleware
+        'BACKEND': 'products.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,9 +78,94 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so concurrent
+                # checkouts wait for it instead of failing with "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 
+# Cache
+# Use Redis when available so cache invalidation is shared by all workers,
+# otherwise fall back to a per-process in-memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'dd-salon',
+        }
+    }
+
+# How long cached catalog queries (home page, product listing) are kept.
+# Entries are also invalidated whenever a product or category is saved.
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+# How long each worker keeps its own copy of the category menu before
+# checking the shared navigation version for changes made elsewhere.
+NAVIGATION_CACHE_TTL = 60
+
+# Part of the catalog page ETags, so a deploy that changes templates
+# invalidates pages browsers already hold.
+RELEASE_VERSION = os.getenv('RELEASE_VERSION', os.getenv('RAILWAY_GIT_COMMIT_SHA', ''))
+
+# Seconds the admin dashboard statistics are cached for
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Minutes that stock reserved at checkout is held for an unpaid order
+STOCK_RESERVATION_MINUTES = 30
+
+# Delivery attempts before a queued email is marked Failed
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Minutes before mail claimed by a worker that never reported back is resent
+OUTBOX_CLAIM_MINUTES = 15
+
+# Days that sent messages are kept in the outbox before being purged
+OUTBOX_SENT_RETENTION_DAYS = 7
+
+# Widths in pixels of the resized JPEG and WebP copies of product and
+# category images, and the encoder quality used for each format
+IMAGE_RENDITION_WIDTHS = [160, 320, 640, 1024]
+IMAGE_RENDITION_QUALITY = {'jpeg': 80, 'webp': 75}
+
+# Most SQL queries each URL name may run with cold caches on the first
+# request of a session, including the session and user lookups and the
+# session save that caches the cart count. Form posts have their own
+# entries, named by method and URL name. Enforced by the test suite and
+# logged as a warning by QueryBudgetMiddleware when exceeded.
+QUERY_BUDGETS = {
+    'home': 8,
+    'products_list': 10,
+    'product_detail': 10,
+    'api_categories': 4,
+    'api_products': 9,
+    'api_product_detail': 7,
+    'cart_view': 9,
+    'checkout': 11,
+    'orders_list': 9,
+    'order_detail': 9,
+    'profile': 9,
+    'payment_selection': 9,
+    'admin_dashboard': 17,
+    'admin_orders': 8,
+    'admin_products': 9,
+    'admin_payments': 8,
+    'POST add_to_cart': 11,
+    'POST update_cart': 7,
+    # Stock is reserved with one conditional update per cart line; measured
+    # with four lines, plus the day's first sales rollup row once committed
+    'POST checkout': 27,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -108,8 +195,19 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# WhiteNoise configuration for static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Tailwind CSS v3 standalone executable, which needs no Node; build_css runs it
+TAILWIND_CLI = os.environ.get('TAILWIND_CLI', 'tailwindcss')
+
+# WhiteNoise serves compressed static files under content-hashed names.
+# STATICFILES_STORAGE is no longer read by Django, so this must be STORAGES.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -123,8 +221,10 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 # Email Configuration
-# EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'  # For production
+# Set EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend (or the
+# filebased backend with EMAIL_FILE_PATH) to stand in for SMTP locally
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
 
 # Email settings (for production)
 EMAIL_HOST = 'smtp.gmail.com'
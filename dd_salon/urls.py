@@ -2,15 +2,21 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from products import views
-from admin_views import admin_dashboard, admin_orders, admin_products, admin_payments, update_order_status, update_payment_status
+from products import api, views
+from admin_views import admin_dashboard, admin_orders, admin_products, admin_payments, update_order_status, bulk_update_order_status, update_payment_status
 from auth_views import CustomPasswordResetView, CustomPasswordResetDoneView, CustomPasswordResetConfirmView, CustomPasswordResetCompleteView
 
 urlpatterns = [
+    # Listed before the Django admin, whose catch-all view would shadow them
+    path('admin/orders/<int:order_id>/update-status/', update_order_status, name='update_order_status'),
+    path('admin/payments/<int:payment_id>/update-status/', update_payment_status, name='update_payment_status'),
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
     path('products/', views.products_list, name='products_list'),
     path('products/<int:product_id>/', views.product_detail, name='product_detail'),
+    path('api/categories/', api.api_categories, name='api_categories'),
+    path('api/products/', api.api_products, name='api_products'),
+    path('api/products/<int:product_id>/', api.api_product_detail, name='api_product_detail'),
     path('login/', views.user_login, name='login'),
     path('register/', views.user_register, name='register'),
     path('logout/', views.user_logout, name='logout'),
@@ -41,8 +47,7 @@ urlpatterns = [
     path('admin-orders/', admin_orders, name='admin_orders'),
     path('admin-products/', admin_products, name='admin_products'),
     path('admin-payments/', admin_payments, name='admin_payments'),
-    path('admin/orders/<int:order_id>/update-status/', update_order_status, name='update_order_status'),
-    path('admin/payments/<int:payment_id>/update-status/', update_payment_status, name='update_payment_status'),
+    path('admin-orders/bulk-status/', bulk_update_order_status, name='bulk_update_order_status'),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, Cart, CartItem, Order, OrderItem, Payment
+from .models import Category, Product, Cart, CartItem, Order, OrderItem, OrderStatusChange, Payment, DailySalesRollup, DailyProductSales, OutboundEmail
 
 
 @admin.register(Category)
@@ -46,10 +46,41 @@ class OrderItemAdmin(admin.ModelAdmin):
     search_fields = ('order__order_number', 'product__name')
 
 
+@admin.register(OrderStatusChange)
+class OrderStatusChangeAdmin(admin.ModelAdmin):
+    list_display = ('order', 'from_status', 'to_status', 'changed_by', 'created_at')
+    list_filter = ('to_status', 'created_at')
+    search_fields = ('order__order_number', 'changed_by__username')
+    raw_id_fields = ('order',)
+
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('order', 'payment_method', 'payment_status', 'amount', 'refund_status', 'created_at')
     list_filter = ('payment_method', 'payment_status', 'refund_status', 'created_at')
     search_fields = ('order__order_number', 'transaction_id', 'refund_transaction_id')
     readonly_fields = ('created_at', 'payment_date', 'refund_initiated_at', 'refund_completed_at')
-    list_editable = ('payment_status', 'refund_status')
\ No newline at end of file
+    list_editable = ('payment_status', 'refund_status')
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'orders_placed', 'revenue', 'paid_orders', 'confirmed_orders', 'cancelled_orders', 'cod_payments')
+    date_hierarchy = 'date'
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'product', 'units_sold', 'revenue')
+    list_select_related = ('product',)
+    date_hierarchy = 'date'
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'to')
+    # Bodies can hold password reset links, so they are not shown
+    exclude = ('body',)
+    readonly_fields = ('created_at', 'claimed_at', 'sent_at', 'last_error')
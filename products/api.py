@@ -0,0 +1,192 @@
+import json
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .cache import cached_catalog
+from .conditional import catalog_page
+from .models import Category, Product
+from .pagination import paginate_keyset, paginate_sequence
+from .views import (
+    DEFAULT_PRODUCT_ORDERING, PRODUCT_SORT_ORDERINGS, PRODUCTS_PER_PAGE, catalog_products, ranked_search_ids,
+)
+
+
+MAX_PRODUCTS_PER_PAGE = 200
+
+# Every decimal the API returns is an amount of money
+CENTS = Decimal('0.01')
+
+# Rows serialized per chunk of a streamed product list
+STREAM_CHUNK_ROWS = 100
+
+# Field names the API offers and the column or expression each one reads
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'image': 'image',
+}
+PRODUCT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'discount_price': 'discount_price',
+    # Mirrors Product.final_price: an empty or zero discount means full price
+    'final_price': Coalesce(NullIf('discount_price', Value(Decimal(0))), 'price'),
+    'stock': 'stock',
+    'category_id': 'category_id',
+    'category_name': 'category__name',
+    'image': 'image',
+    'is_featured': 'is_featured',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+# Product lists leave out the description unless it is asked for
+PRODUCT_LIST_FIELDS = [name for name in PRODUCT_FIELDS if name != 'description']
+
+
+class ApiError(Exception):
+    """A request the API cannot answer, reported as a 400 response"""
+
+
+def _requested_fields(request, fields, default):
+    """The fields named in ?fields=, or default, checked against fields"""
+    requested = request.GET.get('fields', '')
+    names = [name.strip() for name in requested.split(',') if name.strip()] or list(default)
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(fields)}')
+    return list(dict.fromkeys(names))
+
+
+def _values(queryset, fields, names, extra=()):
+    """
+    queryset.values() reading only names, plus the extra columns needed for
+    ordering, without instantiating any models
+    """
+    columns = [name for name in dict.fromkeys([*names, *extra]) if fields.get(name, name) == name]
+    aliases = {
+        name: F(fields[name]) if isinstance(fields[name], str) else fields[name]
+        for name in names if fields[name] != name
+    }
+    return queryset.values(*columns, **aliases)
+
+
+def _present(row, names):
+    # SQLite returns computed decimals such as final_price unquantized
+    data = {
+        name: row[name].quantize(CENTS) if isinstance(row[name], Decimal) else row[name]
+        for name in names
+    }
+    if 'image' in data:
+        data['image'] = default_storage.url(data['image']) if data['image'] else None
+    return data
+
+
+def _is_number(value):
+    """
+    Whether value is a plain ASCII number small enough for a database id;
+    isdigit() alone also accepts digits such as '²', which int() rejects
+    """
+    return value.isascii() and value.isdigit() and len(value) <= 19 and int(value) < 2 ** 63
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+@require_GET
+def api_categories(request):
+    """Active categories, by name"""
+    try:
+        names = _requested_fields(request, CATEGORY_FIELDS, CATEGORY_FIELDS)
+    except ApiError as e:
+        return _error(str(e))
+    rows = cached_catalog('api_categories', (names,), lambda: list(
+        _values(Category.objects.filter(is_active=True).order_by('name'), CATEGORY_FIELDS, names)
+    ))
+    return JsonResponse({'results': [_present(row, names) for row in rows]})
+
+
+def _stream_page(page, names):
+    """Serialize a page of product rows a chunk at a time"""
+    yield '{"results":['
+    rows = page.object_list
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = ','.join(
+            json.dumps(_present(row, names), cls=DjangoJSONEncoder) for row in rows[start:start + STREAM_CHUNK_ROWS]
+        )
+        yield f',{chunk}' if start else chunk
+    yield '],' + json.dumps({
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })[1:]
+
+
+@require_GET
+@catalog_page
+def api_products(request):
+    """
+    Active products with the search, category and sort parameters of the
+    product list page, paginated by ?cursor= and ?limit=
+    """
+    search = request.GET.get('search', '')
+    category_id = request.GET.get('category', '')
+    sort_by = request.GET.get('sort', '')
+    cursor = request.GET.get('cursor', '')
+    try:
+        names = _requested_fields(request, PRODUCT_FIELDS, PRODUCT_LIST_FIELDS)
+        if category_id and not _is_number(category_id):
+            raise ApiError('category must be a category id')
+        limit = request.GET.get('limit', '')
+        if limit and not (_is_number(limit) and 0 < int(limit) <= MAX_PRODUCTS_PER_PAGE):
+            raise ApiError(f'limit must be between 1 and {MAX_PRODUCTS_PER_PAGE}')
+    except ApiError as e:
+        return _error(str(e))
+    per_page = int(limit) if limit else PRODUCTS_PER_PAGE
+
+    def load_ranked_page():
+        search_ids = ranked_search_ids(search, category_id)
+        page = paginate_sequence(search_ids, cursor=cursor, per_page=per_page)
+        rows = {
+            row['id']: row
+            for row in _values(Product.objects.filter(id__in=page.object_list), PRODUCT_FIELDS, names, ['id'])
+        }
+        page.object_list = [rows[pk] for pk in page.object_list if pk in rows]
+        return page
+
+    def load_keyset_page():
+        ordering = PRODUCT_SORT_ORDERINGS.get(sort_by, DEFAULT_PRODUCT_ORDERING)
+        return paginate_keyset(
+            _values(catalog_products(category_id, search=search), PRODUCT_FIELDS, names,
+                    [name.lstrip('-') for name in ordering]),
+            ordering,
+            cursor=cursor,
+            per_page=per_page,
+        )
+
+    # Searches without an explicit sort are ordered by relevance
+    load_page = load_ranked_page if search and not sort_by else load_keyset_page
+    page = cached_catalog('api_products', (search, category_id, sort_by, cursor, per_page, names), load_page)
+    return StreamingHttpResponse(_stream_page(page, names), content_type='application/json')
+
+
+@require_GET
+@catalog_page
+def api_product_detail(request, product_id):
+    """One active product, with its description by default"""
+    try:
+        names = _requested_fields(request, PRODUCT_FIELDS, PRODUCT_FIELDS)
+    except ApiError as e:
+        return _error(str(e))
+    row = _values(Product.objects.filter(pk=product_id, is_active=True), PRODUCT_FIELDS, names).first()
+    if row is None:
+        return _error('Product not found', status=404)
+    return JsonResponse(_present(row, names))
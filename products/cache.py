@@ -0,0 +1,113 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+NAVIGATION_VERSION_KEY = 'navigation:version'
+
+
+def _new_version():
+    # Millisecond timestamp so a version key that was evicted from the cache
+    # never restarts at a value that older entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    """Return the current value of a shared version key, creating it if needed"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Move a shared version key forward, invalidating data stored under it"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _new_version()
+        cache.set(key, version, None)
+        return version
+
+
+def get_catalog_version():
+    """Return the current catalog version, creating it if needed"""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog entry by moving to a new version"""
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def request_catalog_version(request):
+    """
+    The catalog version as first read during this request, so a page and
+    the validators sent with it are always built for the same version
+    """
+    if not hasattr(request, '_catalog_version'):
+        request._catalog_version = get_catalog_version()
+    return request._catalog_version
+
+
+def catalog_cache_key(name, *params, version=None):
+    """Build a cache key for catalog data under version, by default the current one"""
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+    if version is None:
+        version = get_catalog_version()
+    return f'catalog:{version}:{name}:{digest}'
+
+
+def cached_catalog(name, params, builder, version=None):
+    """Return cached catalog data, calling builder() on a miss"""
+    key = catalog_cache_key(name, *params, version=version)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+class LocalTTLCache:
+    """
+    Process-local cache for a single value.
+
+    The value is served from memory until ttl seconds have passed. After
+    that the shared version key is checked: if it has not moved the value is
+    kept for another interval, otherwise builder() is called again. This
+    lets every worker reuse its own copy while still picking up changes
+    made by other workers within one interval.
+    """
+
+    def __init__(self, version_key, builder, ttl):
+        self.version_key = version_key
+        self.builder = builder
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (version, value, expires_at), replaced as a whole so readers
+        # never see a half-updated entry
+        self._entry = None
+
+    def get(self):
+        entry = self._entry
+        if entry is not None and time.monotonic() < entry[2]:
+            return entry[1]
+        with self._lock:
+            entry = self._entry
+            if entry is not None and time.monotonic() < entry[2]:
+                return entry[1]
+            version = get_version(self.version_key)
+            if entry is not None and entry[0] == version:
+                value = entry[1]
+            else:
+                value = self.builder()
+            self._entry = (version, value, time.monotonic() + self.ttl)
+            return value
+
+    def clear(self):
+        self._entry = None
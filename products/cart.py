@@ -0,0 +1,37 @@
+from django.db.models import Sum
+
+from .models import CartItem
+
+
+CART_COUNT_SESSION_KEY = 'cart_items_count'
+
+
+def count_cart_items(user):
+    """Count the units in a user's cart with a single aggregate query"""
+    return CartItem.objects.filter(cart__user=user).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def get_cart_count(request):
+    """Return the cart badge count, computing it once per session at most"""
+    if not request.user.is_authenticated:
+        return 0
+    count = request.session.get(CART_COUNT_SESSION_KEY)
+    if count is None:
+        count = set_cart_count(request, count_cart_items(request.user))
+    return count
+
+
+def set_cart_count(request, count):
+    """Store the cart badge count in the session"""
+    count = max(count, 0)
+    request.session[CART_COUNT_SESSION_KEY] = count
+    return count
+
+
+def adjust_cart_count(request, delta):
+    """Apply an incremental change to the cached cart badge count"""
+    count = request.session.get(CART_COUNT_SESSION_KEY)
+    if count is None:
+        # Nothing cached yet; the next read will count the cart from scratch
+        return None
+    return set_cart_count(request, count + delta)
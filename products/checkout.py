@@ -0,0 +1,78 @@
+from collections import Counter
+
+from django.db import transaction
+
+from .inventory import InsufficientStock, release_orders_stock, reservation_deadline, reserve_stock
+from .models import Order, OrderItem
+
+
+SHIPPING_FIELDS = (
+    'shipping_name',
+    'shipping_phone',
+    'shipping_address',
+    'shipping_city',
+    'shipping_state',
+    'shipping_pincode',
+)
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order"""
+
+
+def place_order(user, cart, shipping):
+    """
+    Create a Payment_Pending order from the cart in a single transaction.
+
+    Cart lines are loaded with their products in one query and the price
+    of every line is snapshotted once. Stock held by the user's earlier
+    unpaid orders is released and stock for every line is reserved, then
+    all order items are written with one bulk_create. Either the
+    whole order is written and its stock held, or nothing is.
+    """
+    lines = list(cart.items.select_related('product').order_by('id'))
+    if not lines:
+        raise CheckoutError('Your cart is empty')
+
+    items = [
+        OrderItem(
+            product=line.product,
+            quantity=line.quantity,
+            price=line.product.final_price,
+        )
+        for line in lines
+    ]
+
+    quantities = Counter()
+    for line in lines:
+        quantities[line.product_id] += line.quantity
+
+    with transaction.atomic():
+        # A shopper who checks out again, e.g. after going back from the
+        # payment page, holds stock for the newest order only. An earlier
+        # order reserves its stock again if it is paid after all.
+        earlier = list(Order.objects.filter(
+            user=user, status='Payment_Pending', stock_reserved=True
+        ).values_list('pk', flat=True))
+        if earlier:
+            release_orders_stock(earlier)
+        try:
+            reserve_stock(quantities)
+        except InsufficientStock as e:
+            product = next(line.product for line in lines if line.product_id == e.product_id)
+            raise CheckoutError(f'Sorry, {product.name} does not have enough stock left') from e
+
+        order = Order.objects.create(
+            user=user,
+            order_number=Order.generate_order_number(),
+            total_amount=sum(item.total_price for item in items),
+            status='Payment_Pending',
+            stock_reserved=True,
+            reserved_until=reservation_deadline(),
+            **{field: shipping.get(field) for field in SHIPPING_FIELDS},
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+
+    return order
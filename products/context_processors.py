@@ -1,17 +1,12 @@
+from .cart import get_cart_count
+from .navigation import get_active_categories
+
+
 def cart_context(request):
     """Add cart information to all templates"""
-    from .models import Category
-    
     context = {}
-    if request.user.is_authenticated:
-        try:
-            cart = request.user.cart
-            context['cart_items_count'] = cart.total_items
-        except:
-            context['cart_items_count'] = 0
-    else:
-        context['cart_items_count'] = 0
+    context['cart_items_count'] = get_cart_count(request)
     
     # Add categories for footer
-    context['footer_categories'] = Category.objects.filter(is_active=True)[:4]
+    context['footer_categories'] = get_active_categories()[:4]
     return context
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Category, DailyProductSales, DailySalesRollup, Order, Payment, Product
+
+
+DASHBOARD_CACHE_KEY = 'admin:dashboard-stats'
+
+
+def compute_dashboard_stats():
+    """Compute all admin dashboard statistics with one aggregate per table"""
+    today = timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    # Order statistics
+    orders = Order.objects.aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='Payment_Pending')),
+        confirmed_orders=Count('id', filter=Q(status='Confirmed')),
+        processing_orders=Count('id', filter=Q(status='Processing')),
+        shipped_orders=Count('id', filter=Q(status='Shipped')),
+        delivered_orders=Count('id', filter=Q(status='Delivered')),
+        cancelled_orders=Count('id', filter=Q(status='Cancelled')),
+        recent_orders=Count('id', filter=Q(created_at__date__gte=week_ago)),
+    )
+
+    # Revenue statistics, read from the daily rollups
+    revenue = DailySalesRollup.objects.aggregate(
+        total_revenue=Sum('revenue'),
+        monthly_revenue=Sum('revenue', filter=Q(date__gte=month_ago)),
+    )
+    revenue['total_revenue'] = revenue['total_revenue'] or 0
+    revenue['monthly_revenue'] = revenue['monthly_revenue'] or 0
+
+    # Product statistics
+    products = Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(is_active=True)),
+        featured_products=Count('id', filter=Q(is_featured=True)),
+        low_stock_products=Count('id', filter=Q(stock__lt=10)),
+    )
+
+    # Category statistics
+    categories = Category.objects.aggregate(
+        total_categories=Count('id'),
+        active_categories=Count('id', filter=Q(is_active=True)),
+    )
+
+    # Payment statistics
+    payments = Payment.objects.aggregate(
+        cod_orders=Count('id', filter=Q(payment_method='COD')),
+        online_payments=Count('id', filter=Q(payment_method__in=['UPI', 'CARD', 'NETBANKING'])),
+        pending_refunds=Count('id', filter=Q(refund_status='Pending')),
+    )
+
+    # User statistics
+    users = User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        staff_users=Count('id', filter=Q(is_staff=True)),
+        recent_users=Count('id', filter=Q(date_joined__date__gte=week_ago)),
+    )
+
+    # Lists, evaluated here so they can be cached with the counts
+    recent_orders_list = list(Order.objects.select_related('user').order_by('-created_at')[:10])
+
+    top_products = list(DailyProductSales.objects.values('product__name').annotate(
+        total_sold=Sum('units_sold')
+    ).order_by('-total_sold')[:5])
+
+    top_customers = list(User.objects.annotate(
+        order_count=Count('orders')
+    ).filter(order_count__gt=0).order_by('-order_count')[:5])
+
+    # Top customers by spending (only from completed orders, not cancelled)
+    top_spenders = list(User.objects.annotate(
+        total_spent=Sum('orders__total_amount', filter=Q(orders__status__in=Order.REVENUE_STATUSES))
+    ).filter(total_spent__gt=0).order_by('-total_spent')[:5])
+
+    return {
+        **orders,
+        **revenue,
+        **products,
+        **categories,
+        **payments,
+        **users,
+        'recent_orders_list': recent_orders_list,
+        'top_products': top_products,
+        'top_customers': top_customers,
+        'top_spenders': top_spenders,
+        'generated_at': timezone.now(),
+    }
+
+
+def get_dashboard_stats(refresh=False):
+    """
+    Return (stats, from_cache). Statistics are cached for
+    DASHBOARD_CACHE_TIMEOUT seconds; refresh=True recomputes them.
+    """
+    if not refresh:
+        stats = cache.get(DASHBOARD_CACHE_KEY)
+        if stats is not None:
+            return stats, True
+    stats = compute_dashboard_stats()
+    cache.set(DASHBOARD_CACHE_KEY, stats, settings.DASHBOARD_CACHE_TIMEOUT)
+    return stats, False
@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import release_orders_stock
+from .models import Order, OrderStatusChange
+from .rollups import record_status_changes
+
+
+# Statuses an order may move to from each status
+ALLOWED_TRANSITIONS = {
+    'Pending': {'Payment_Pending', 'Cancelled'},
+    'Payment_Pending': {'Paid', 'Confirmed', 'Cancelled'},
+    'Paid': {'Confirmed', 'Processing', 'Cancelled'},
+    'Confirmed': {'Processing', 'Cancelled'},
+    'Processing': {'Shipped', 'Cancelled'},
+    'Shipped': {'Delivered'},
+    'Delivered': set(),
+    'Cancelled': set(),
+}
+
+
+class TransitionError(Exception):
+    """Raised when a bulk status transition cannot be applied at all"""
+
+
+class TransitionResult:
+    """Outcome of a bulk transition: the orders moved and why others were not"""
+
+    def __init__(self, status):
+        self.status = status
+        self.updated = []
+        self.failures = {}
+
+    def fail(self, order_ref, reason):
+        self.failures[order_ref] = reason
+
+    def __bool__(self):
+        return bool(self.updated)
+
+
+def transition_orders(order_ids, new_status, changed_by=None, note=''):
+    """
+    Move the orders in order_ids to new_status.
+
+    Orders are locked and grouped by their current status, then each group
+    is moved with one conditional UPDATE, all in one transaction. Orders
+    that are missing or may not make the transition are reported in the
+    result rather than failing the batch. UPDATE skips model signals, so the
+    sales rollups, the audit trail and released stock are applied here.
+    """
+    if new_status not in ALLOWED_TRANSITIONS:
+        raise TransitionError(f'Unknown status {new_status}')
+
+    order_ids = set(order_ids)
+    result = TransitionResult(new_status)
+
+    with transaction.atomic():
+        orders = list(Order.objects.select_for_update().filter(pk__in=order_ids).only(
+            'id', 'order_number', 'status', 'total_amount', 'created_at'
+        ).order_by('pk'))
+        for missing in sorted(order_ids - {order.pk for order in orders}):
+            result.fail(missing, 'Order not found')
+
+        groups = defaultdict(list)
+        for order in orders:
+            if order.status == new_status:
+                result.fail(order.order_number, f'Already {new_status}')
+            elif new_status not in ALLOWED_TRANSITIONS.get(order.status, ()):
+                result.fail(order.order_number, f'Cannot move from {order.status} to {new_status}')
+            else:
+                groups[order.status].append(order)
+
+        if not groups:
+            return result
+
+        changes = []
+        updates = {'status': new_status}
+        if new_status == 'Cancelled':
+            # As when a customer cancels in cancel_order
+            updates.update(cancelled_at=timezone.now(), is_cancellable=False)
+            if note:
+                updates['cancellation_reason'] = note
+        for old_status, group in sorted(groups.items()):
+            moved = Order.objects.filter(pk__in=[order.pk for order in group], status=old_status).update(**updates)
+            if moved != len(group):
+                raise TransitionError('Orders changed while being updated, please retry')
+            for order in group:
+                changes.append((order, old_status, new_status))
+                result.updated.append(order.order_number)
+
+        OrderStatusChange.objects.bulk_create(
+            OrderStatusChange(order=order, from_status=old_status, to_status=new_status,
+                              changed_by=changed_by, note=note)
+            for order, old_status, new_status in changes
+        )
+        record_status_changes(changes)
+
+        if new_status == 'Cancelled':
+            release_orders_stock([order.pk for order, _, _ in changes])
+
+    return result
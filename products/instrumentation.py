@@ -0,0 +1,163 @@
+import contextvars
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template.backends.django import DjangoTemplates
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """
+    Context manager that records the queries run on a database connection.
+
+    Unlike django.test.utils.CaptureQueriesContext it works with DEBUG off,
+    so it can be used to report query costs in production.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.queries = []
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._started
+        self._wrapper.__exit__(*exc_info)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def sql_time(self):
+        return sum(duration for sql, duration in self.queries)
+
+    @property
+    def duplicates(self):
+        """{sql: times run} for statements run more than once, the mark of an N+1"""
+        return {sql: n for sql, n in Counter(sql for sql, duration in self.queries).items() if n > 1}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers, p between 0 and 1"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class RenderTimer:
+    """Accumulates the time spent rendering templates during one request"""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+
+_render_timer = contextvars.ContextVar('render_timer', default=None)
+
+
+class TimedTemplate:
+    """Template wrapper that adds its render time to the current RenderTimer"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timer = _render_timer.get()
+        if timer is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timer.elapsed += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend whose templates report their render time"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def query_budget(method, url_name):
+    """
+    The QUERY_BUDGETS entry for a request: the URL name for reads, and for
+    writes the method and URL name, such as 'POST checkout'
+    """
+    if method in ('GET', 'HEAD'):
+        return settings.QUERY_BUDGETS.get(url_name)
+    return settings.QUERY_BUDGETS.get(f'{method} {url_name}')
+
+
+class QueryBudgetMiddleware:
+    """
+    Record the query count, SQL time, repeated statements and template
+    render time of each request, keyed by its method and URL name.
+
+    Requests over their QUERY_BUDGETS entry are logged as warnings, the
+    rest at debug level. Staff users also get the figures back as
+    X-Query-* and Server-Timing response headers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = RenderTimer()
+        token = _render_timer.set(timer)
+        try:
+            with QueryCounter() as counter:
+                response = self.get_response(request)
+        finally:
+            _render_timer.reset(token)
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        if url_name is None:
+            return response
+
+        duplicates = counter.duplicates
+        budget = query_budget(request.method, url_name)
+        over_budget = budget is not None and counter.count > budget
+        logger.log(
+            logging.WARNING if over_budget else logging.DEBUG,
+            '%s %s: %d queries (budget %s), %d repeated, %.1fms SQL, %.1fms templates, %.1fms total',
+            request.method, url_name, counter.count, budget, sum(duplicates.values()) - len(duplicates),
+            counter.sql_time * 1000, timer.elapsed * 1000, counter.elapsed * 1000,
+        )
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['X-Query-Count'] = str(counter.count)
+            response['X-Query-Budget'] = '' if budget is None else str(budget)
+            response['X-Query-Repeated'] = str(sum(duplicates.values()) - len(duplicates))
+            response['Server-Timing'] = ', '.join([
+                f'sql;dur={counter.sql_time * 1000:.1f};desc="{counter.count} queries"',
+                f'templates;dur={timer.elapsed * 1000:.1f}',
+                f'total;dur={counter.elapsed * 1000:.1f}',
+            ])
+        return response
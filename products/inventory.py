@@ -0,0 +1,139 @@
+from collections import Counter
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import Order, OrderItem, Product
+
+
+class InsufficientStock(Exception):
+    """Raised when a product does not have enough stock left to reserve"""
+
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f'Not enough stock for product {product_id} (requested {requested})')
+
+
+def reservation_deadline():
+    return timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_MINUTES)
+
+
+def reserve_stock(quantities):
+    """
+    Take stock for {product_id: quantity} using conditional updates.
+
+    Each product is decremented with UPDATE ... SET stock = stock - n
+    WHERE stock >= n, so no row is read and locked ahead of time and stock
+    can never go negative. Must run inside a transaction so that a failure
+    on a later product rolls back the earlier decrements. Products are
+    updated in id order so concurrent reservations cannot deadlock.
+    """
+    for product_id, quantity in sorted(quantities.items()):
+        updated = Product.objects.filter(pk=product_id, stock__gte=quantity).update(
+            stock=F('stock') - quantity, updated_at=timezone.now()
+        )
+        if not updated:
+            raise InsufficientStock(product_id, quantity)
+
+    _refresh_if_availability_changed(Q(pk__in=list(quantities), stock=0))
+
+
+def _refresh_if_availability_changed(changed):
+    """
+    Refresh cached catalog pages once a product sold out or came back.
+
+    Ordinary stock movements leave the catalog version alone, since bumping
+    it drops every cached page and ETag site-wide; the counts shown on
+    cached pages may lag until the entry expires, while checkout itself
+    always works on the live stock.
+    """
+    if Product.objects.filter(changed).exists():
+        transaction.on_commit(bump_catalog_version)
+
+
+def _order_quantities(order):
+    rows = order.items.values('product_id').annotate(quantity=Sum('quantity'))
+    return Counter({row['product_id']: row['quantity'] for row in rows})
+
+
+def _return_stock(quantities):
+    for product_id, quantity in sorted(quantities.items()):
+        Product.objects.filter(pk=product_id).update(stock=F('stock') + quantity, updated_at=timezone.now())
+    if quantities:
+        # Back in stock when all that is left is what was just returned
+        _refresh_if_availability_changed(
+            reduce(or_, (Q(pk=product_id, stock=quantity) for product_id, quantity in quantities.items()))
+        )
+
+
+def confirm_reservation(order):
+    """
+    Make the stock held by an order permanent once it is paid.
+
+    If the hold already expired the stock is reserved again, raising
+    InsufficientStock when it has been sold in the meantime.
+    """
+    with transaction.atomic():
+        held = Order.objects.filter(pk=order.pk, stock_reserved=True).update(reserved_until=None)
+        if not held:
+            reserve_stock(_order_quantities(order))
+            Order.objects.filter(pk=order.pk).update(stock_reserved=True, reserved_until=None)
+    order.stock_reserved = True
+    order.reserved_until = None
+
+
+def release_order_stock(order):
+    """Give back the stock held by an order; returns False if it held none"""
+    with transaction.atomic():
+        released = Order.objects.filter(pk=order.pk, stock_reserved=True).update(
+            stock_reserved=False, reserved_until=None
+        )
+        if released:
+            _return_stock(_order_quantities(order))
+    order.stock_reserved = False
+    order.reserved_until = None
+    return bool(released)
+
+
+def release_orders_stock(order_ids):
+    """
+    Give back the stock held by many orders at once, with one update for
+    the orders and one per product; returns the ids that held stock.
+    """
+    with transaction.atomic():
+        reserved = list(Order.objects.select_for_update().filter(
+            pk__in=order_ids, stock_reserved=True
+        ).values_list('pk', flat=True))
+        if reserved:
+            Order.objects.filter(pk__in=reserved).update(stock_reserved=False, reserved_until=None)
+            rows = OrderItem.objects.filter(order_id__in=reserved).values('product_id').annotate(
+                quantity=Sum('quantity')
+            )
+            _return_stock(Counter({row['product_id']: row['quantity'] for row in rows}))
+    return reserved
+
+
+def release_expired_reservations(now=None):
+    """Release the stock of unpaid orders whose hold has expired"""
+    now = now or timezone.now()
+    expired = Order.objects.filter(
+        status='Payment_Pending', stock_reserved=True, reserved_until__lt=now
+    ).values_list('pk', flat=True)
+
+    released = 0
+    for order_id in list(expired):
+        with transaction.atomic():
+            # Conditional update so a payment confirmed in the meantime wins
+            if Order.objects.filter(pk=order_id, stock_reserved=True, reserved_until__lt=now).update(
+                stock_reserved=False, reserved_until=None
+            ):
+                _return_stock(_order_quantities(Order(pk=order_id)))
+                released += 1
+    return released
@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def queue_mail(subject, body, to, from_email=None, html=False):
+    """Store a message in the outbox for the mail worker to deliver"""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        is_html=html,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=','.join(to),
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: one minute after the first failure, doubling up to an hour"""
+    return timedelta(minutes=min(2 ** (attempts - 1), 60))
+
+
+def _build_message(email, connection):
+    message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+    if email.is_html:
+        message.content_subtype = 'html'
+    return message
+
+
+def _claim_batch(batch_size):
+    """
+    Mark a batch of due messages Sending in one short transaction and
+    return them. Rows are locked with SKIP LOCKED where supported so
+    several workers can drain the outbox. A claim older than
+    OUTBOX_CLAIM_MINUTES is taken to belong to a worker that died.
+    """
+    now = timezone.now()
+    abandoned = now - timedelta(minutes=settings.OUTBOX_CLAIM_MINUTES)
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='Queued', next_attempt_at__lte=now)
+                | Q(status='Sending', claimed_at__lt=abandoned)
+            )
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(status='Sending', claimed_at=now)
+    for email in batch:
+        email.claimed_at = now
+    return batch
+
+
+def _record_result(email, error, max_attempts):
+    """Store the outcome of one delivery attempt, unless the claim was lost"""
+    attempts = email.attempts + 1
+    if error is None:
+        # Sent mail such as password reset links is not kept
+        changes = {'status': 'Sent', 'sent_at': timezone.now(), 'body': '', 'last_error': ''}
+    else:
+        logger.warning('Sending mail %s failed (attempt %s): %s', email.pk, attempts, error)
+        changes = {'last_error': repr(error)}
+        if attempts >= max_attempts:
+            changes['status'] = 'Failed'
+        else:
+            changes['status'] = 'Queued'
+            changes['next_attempt_at'] = timezone.now() + retry_delay(attempts)
+    return OutboundEmail.objects.filter(
+        pk=email.pk, status='Sending', claimed_at=email.claimed_at,
+    ).update(attempts=attempts, claimed_at=None, **changes)
+
+
+def send_queued_mail(batch_size=50, max_attempts=None):
+    """
+    Deliver one batch of due outbox messages over a single connection.
+
+    Returns (sent, failed). The batch is claimed in a short transaction and
+    sent outside it, and each result is saved as soon as it is known. A
+    failed message is retried with exponential backoff and marked Failed
+    after max_attempts.
+    """
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    sent = failed = 0
+
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return sent, failed
+
+    connection = get_connection()
+    try:
+        connection.open()
+        connection_error = None
+    except Exception as e:
+        connection_error = e
+
+    try:
+        for email in batch:
+            error = connection_error
+            if error is None:
+                try:
+                    connection.send_messages([_build_message(email, connection)])
+                except Exception as e:
+                    error = e
+            _record_result(email, error, max_attempts)
+            if error is None:
+                sent += 1
+            else:
+                failed += 1
+    finally:
+        if connection_error is None:
+            connection.close()
+
+    return sent, failed
+
+
+def purge_sent_mail():
+    """Delete sent messages older than OUTBOX_SENT_RETENTION_DAYS and return how many"""
+    cutoff = timezone.now() - timedelta(days=settings.OUTBOX_SENT_RETENTION_DAYS)
+    deleted, _ = OutboundEmail.objects.filter(status='Sent', sent_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from products.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollup tables from the full order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        days, product_days = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {days} daily rollup(s) and {product_days} product/day row(s)'
+        ))
@@ -0,0 +1,392 @@
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, IntegrityError, OperationalError, connection, connections
+from django.db.models import Count, F, Sum
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from products.fulfilment import transition_orders
+from products.instrumentation import percentile
+from products.models import CartItem, Order, Product
+
+
+SHIPPING = {
+    'shipping_name': 'Load Test Customer',
+    'shipping_phone': '0000000000',
+    'shipping_address': 'Load Test Street',
+    'shipping_city': 'Ahmedabad',
+    'shipping_state': 'Gujarat',
+    'shipping_pincode': '380015',
+}
+
+PAYMENT_METHODS = ['COD', 'UPI', 'CARD', 'NETBANKING']
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+STEPS = ['login', 'browse', 'add_to_cart', 'checkout', 'payment']
+
+PAYMENT_URL_RE = re.compile(r'/payment/(\d+)/')
+
+
+class ClientTransport:
+    """Requests served in this process through the test client"""
+
+    def __init__(self, user_id):
+        self.client = Client()
+        self.user_id = user_id
+
+    def login(self):
+        self.client.force_login(User.objects.get(pk=self.user_id))
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            response = self.client.post(path, data or {})
+        else:
+            response = self.client.get(path)
+        return response.status_code, response.get('Location', '')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTransport:
+    """Requests sent over HTTP to a running server, with cookies and CSRF"""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect()
+        )
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ''
+
+    def login(self):
+        self.request('GET', reverse('login'))
+        status, location = self.request('POST', reverse('login'), {
+            'username': self.username, 'password': self.password,
+        })
+        if status != 302:
+            raise CommandError(f'Could not log in as {self.username}; check --password')
+
+    def request(self, method, path, data=None):
+        body = None
+        if method == 'POST':
+            body = urllib.parse.urlencode({**(data or {}), 'csrfmiddlewaretoken': self._csrf_token()}).encode()
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status, response.headers.get('Location', '')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get('Location', '')
+
+
+def classify_error(error):
+    """Group a request failure into lock, duplicate_order_number or other"""
+    message = str(error).lower()
+    if isinstance(error, IntegrityError) and 'order_number' in message:
+        return 'duplicate_order_number'
+    if isinstance(error, OperationalError) and 'locked' in message:
+        return 'lock'
+    if isinstance(error, DatabaseError) and ('deadlock' in message or 'could not serialize' in message):
+        return 'lock'
+    return 'other'
+
+
+def run_session(job):
+    """
+    One shopper: log in, browse, add to cart, check out and pay.
+
+    Returns the per-step latencies, the outcome (completed, rejected or
+    failed), the error kind of a failure and the id of the order placed.
+    """
+    if job['url']:
+        transport = HttpTransport(job['url'], job['username'], job['password'])
+    else:
+        transport = ClientTransport(job['user_id'])
+    result = {'timings': [], 'outcome': 'completed', 'error': None, 'order_id': None}
+
+    def hit(step, method, path, data=None):
+        started = time.perf_counter()
+        status, location = transport.request(method, path, data)
+        result['timings'].append((step, time.perf_counter() - started))
+        if status >= 500:
+            raise RuntimeError(f'{method} {path} returned {status}')
+        return status, location
+
+    try:
+        started = time.perf_counter()
+        transport.login()
+        result['timings'].append(('login', time.perf_counter() - started))
+
+        hit('browse', 'GET', reverse('home'))
+        hit('browse', 'GET', reverse('products_list'))
+        for product_id in job['browse']:
+            hit('browse', 'GET', reverse('product_detail', args=[product_id]))
+        for product_id in job['cart']:
+            hit('add_to_cart', 'POST', reverse('add_to_cart', args=[product_id]))
+
+        hit('checkout', 'GET', reverse('checkout'))
+        status, location = hit('checkout', 'POST', reverse('checkout'), SHIPPING)
+        match = PAYMENT_URL_RE.search(location)
+        if status != 302 or not match:
+            # Redirected back to the cart: an item sold out under us
+            result['outcome'] = 'rejected'
+            result['rejected_at'] = 'checkout'
+            return result
+        order_id = int(match.group(1))
+        result['order_id'] = order_id
+
+        hit('payment', 'GET', reverse('payment_selection', args=[order_id]))
+        status, location = hit('payment', 'POST', reverse('process_payment', args=[order_id]), {
+            'payment_method': job['payment_method'],
+        })
+        if status != 302 or reverse('payment_success', args=[order_id]) not in location:
+            result['outcome'] = 'rejected'
+            result['rejected_at'] = 'payment'
+    except CommandError:
+        raise
+    except Exception as e:
+        result['outcome'] = 'failed'
+        result['error'] = classify_error(e) if not job['url'] else 'server_error'
+        result['message'] = repr(e)[:200]
+    finally:
+        if not job['url']:
+            connection.close()
+    return result
+
+
+def _init_process():
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Simulate many shoppers browsing, checking out and paying at once, and report throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=200, help='Number of shopper sessions')
+        parser.add_argument('--concurrency', type=int, default=16, help='Sessions running at once')
+        parser.add_argument('--mode', choices=['threads', 'processes'], default='threads',
+                            help='How in-process sessions run in parallel')
+        parser.add_argument('--url', default='', help='Send requests over HTTP to a running server instead')
+        parser.add_argument('--gunicorn', type=int, default=0, metavar='WORKERS',
+                            help='Start gunicorn with this many workers and send requests to it')
+        parser.add_argument('--prefix', default='loadtest-',
+                            help='Username prefix of the dedicated shoppers the run creates')
+        parser.add_argument('--password', default='password123', help='Password given to those users')
+        parser.add_argument('--browse', type=int, default=3, help='Product pages viewed per session')
+        parser.add_argument('--items', type=int, default=2, help='Products added to the cart per session')
+        parser.add_argument('--hot', type=int, default=20, help='Number of popular products sessions pick from')
+        parser.add_argument('--payment-method', choices=PAYMENT_METHODS + ['mixed'], default='mixed')
+        parser.add_argument('--wal', action='store_true', help='Switch a SQLite database to WAL journaling first')
+        parser.add_argument('--max-error-rate', type=float, default=0.01,
+                            help='Fail when more than this fraction of sessions fail')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible sessions')
+        parser.add_argument('--keep', action='store_true', help='Keep the shoppers and orders the run created')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        journal_mode = self._prepare_database(options['wal'])
+        jobs = self._jobs(options, rng)
+
+        server = None
+        if options['gunicorn']:
+            server, options['url'] = self._start_gunicorn(options['gunicorn'])
+        for job in jobs:
+            job['url'] = options['url']
+
+        run_started = timezone.now()
+        try:
+            started = time.perf_counter()
+            results = self._run(jobs, options)
+            elapsed = time.perf_counter() - started
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+        # Include orders whose session failed after the order was committed
+        user_ids = [job['user_id'] for job in jobs]
+        orders = Order.objects.filter(user_id__in=user_ids, created_at__gte=run_started)
+        order_ids = list(orders.values_list('pk', flat=True))
+        try:
+            self._report(options, journal_mode, results, elapsed, order_ids)
+        finally:
+            if not options['keep']:
+                if order_ids:
+                    transition_orders(order_ids, 'Cancelled', note='bench_checkout_load cleanup')
+                    Order.objects.filter(pk__in=order_ids).delete()
+                # Shoppers still holding orders kept by an earlier run stay
+                User.objects.filter(pk__in=user_ids).exclude(
+                    pk__in=Order.objects.filter(user_id__in=user_ids).values('user_id')
+                ).delete()
+
+    def _prepare_database(self, wal):
+        if connection.vendor != 'sqlite':
+            if wal:
+                self.stdout.write(self.style.WARNING(f'--wal ignored on {connection.vendor}'))
+            return ''
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL' if wal else 'PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+    def _shoppers(self, prefix, count, password):
+        """
+        Dedicated users for the sessions, created as needed, so the run never
+        touches the carts or orders of real or generated customers
+        """
+        usernames = [f'{prefix}{i:05d}' for i in range(count)]
+        password_hash = make_password(password)
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=username, email=f'{username}@example.com', password=password_hash)
+            for username in usernames if username not in existing
+        ])
+        users = User.objects.filter(username__in=usernames)
+        users.update(password=password_hash)
+        return list(users.order_by('username').values_list('pk', 'username'))
+
+    def _jobs(self, options, rng):
+        users = self._shoppers(options['prefix'], options['sessions'], options['password'])
+        hot = list(Product.objects.filter(is_active=True, stock__gt=0).annotate(
+            units_sold=Sum('daily_sales__units_sold')
+        ).order_by(F('units_sold').desc(nulls_last=True), '-id').values_list('pk', flat=True)[:options['hot']])
+        if not hot:
+            raise CommandError('No products in stock; run generate_dataset first')
+
+        # Every session starts from an empty cart
+        CartItem.objects.filter(cart__user_id__in=[user_id for user_id, _ in users]).delete()
+
+        jobs = []
+        for user_id, username in users:
+            jobs.append({
+                'user_id': user_id,
+                'username': username,
+                'password': options['password'],
+                'browse': [rng.choice(hot) for _ in range(options['browse'])],
+                'cart': rng.sample(hot, min(options['items'], len(hot))),
+                'payment_method': (rng.choice(PAYMENT_METHODS) if options['payment_method'] == 'mixed'
+                                   else options['payment_method']),
+            })
+        return jobs
+
+    def _start_gunicorn(self, workers):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', 'dd_salon.wsgi',
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ], cwd=settings.BASE_DIR)
+        url = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('gunicorn exited before it started serving')
+            try:
+                urllib.request.urlopen(url + reverse('home'), timeout=2).read()
+                return server, url
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError('gunicorn did not start within 30 seconds')
+
+    def _run(self, jobs, options):
+        if options['url'] or options['mode'] == 'threads':
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                return list(pool.map(run_session, jobs))
+        # Child processes must not share this process's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['concurrency'], initializer=_init_process) as pool:
+            return list(pool.map(run_session, jobs))
+
+    def _report(self, options, journal_mode, results, elapsed, order_ids):
+        outcomes = Counter(result['outcome'] for result in results)
+        errors = Counter(result['error'] for result in results if result['error'])
+        timings = defaultdict(list)
+        for result in results:
+            for step, seconds in result['timings']:
+                timings[step].append(seconds * 1000)
+        requests = sum(len(values) for step, values in timings.items() if step != 'login' or options['url'])
+        duplicates = Order.objects.filter(
+            order_number__in=Order.objects.filter(pk__in=order_ids).values('order_number')
+        ).values('order_number').annotate(n=Count('id')).filter(n__gt=1).count()
+
+        transport = options['url'] or f'in-process {options["mode"]}'
+        database = f'{connection.vendor} (journal_mode {journal_mode})' if journal_mode else connection.vendor
+        self.stdout.write(f'Database:        {database}')
+        self.stdout.write(f'Transport:       {transport}, concurrency {options["concurrency"]}')
+        self.stdout.write(f'Sessions:        {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.1f}/s)')
+        self.stdout.write(f'Requests:        {requests} ({requests / elapsed:.1f}/s)')
+        self.stdout.write(f'Orders placed:   {len(order_ids)}')
+        self.stdout.write(f'Orders paid:     {outcomes["completed"]} ({outcomes["completed"] / elapsed:.1f}/s)')
+        rejected = Counter(result['rejected_at'] for result in results if result['outcome'] == 'rejected')
+        self.stdout.write(f'  rejected:      {outcomes["rejected"]} (out of stock at checkout {rejected["checkout"]}, '
+                          f'at payment {rejected["payment"]})')
+        self.stdout.write(f'  failed:        {outcomes["failed"]} ({outcomes["failed"] / len(results):.1%})')
+        for kind, count in errors.most_common():
+            self.stdout.write(f'    {kind}: {count}')
+        self.stdout.write(f'Duplicate order numbers: {duplicates + errors["duplicate_order_number"]}')
+
+        self.stdout.write(f'\n{"Step":<14}{"n":>7}{"p50":>9}{"p95":>9}{"p99":>9}{"max":>9}  (ms)')
+        for step in STEPS:
+            values = timings.get(step)
+            if values:
+                self.stdout.write(
+                    f'{step:<14}{len(values):>7}{percentile(values, 0.5):>9.1f}{percentile(values, 0.95):>9.1f}'
+                    f'{percentile(values, 0.99):>9.1f}{max(values):>9.1f}'
+                )
+        for step in ('checkout', 'payment'):
+            self._histogram(step, timings.get(step, []))
+
+        for message in sorted({result['message'] for result in results if result['error']})[:5]:
+            self.stdout.write(self.style.WARNING(f'  {message}'))
+
+        if duplicates or errors['duplicate_order_number']:
+            raise CommandError('Duplicate order numbers were generated')
+        if outcomes['failed'] / len(results) > options['max_error_rate']:
+            raise CommandError(f'{outcomes["failed"]} of {len(results)} sessions failed')
+        self.stdout.write(self.style.SUCCESS('Load test passed'))
+
+    def _histogram(self, step, values):
+        if not values:
+            return
+        self.stdout.write(f'\n{step} latency histogram')
+        counts = Counter()
+        for value in values:
+            bucket = next((bound for bound in HISTOGRAM_BUCKETS if value <= bound), None)
+            counts[bucket] += 1
+        widest = max(counts.values())
+        for bound in HISTOGRAM_BUCKETS + [None]:
+            label = f'<= {bound} ms' if bound else f'>  {HISTOGRAM_BUCKETS[-1]} ms'
+            bar = '#' * round(40 * counts[bound] / widest)
+            self.stdout.write(f'  {label:>12} {counts[bound]:>6} {bar}')
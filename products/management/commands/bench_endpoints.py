@@ -0,0 +1,169 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from products.instrumentation import QueryCounter, percentile
+from products.models import Cart, Product
+from products.navigation import _active_categories
+
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'bench_baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main pages through the test client and compare them with a saved baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint')
+        parser.add_argument('--cold', action='store_true', help='Clear caches before every request')
+        parser.add_argument('--search', default='shampoo', help='Search term for the search endpoints')
+        parser.add_argument('--only', nargs='*', default=None, help='Benchmark only these endpoint names')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='JSON baseline file')
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+        parser.add_argument('--metric', choices=['p50', 'p95', 'p99'], default='p50',
+                            help='Latency percentile compared with the baseline; p50 is the least noisy')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown over the baseline, as a fraction')
+        parser.add_argument('--slack-ms', type=float, default=2.0,
+                            help='Absolute slowdown always tolerated, to absorb noise on fast pages')
+
+    def handle(self, *args, **options):
+        endpoints = self._endpoints(options['search'])
+        if options['only']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['only']]
+
+        results = {}
+        for name, url, client in endpoints:
+            results[name] = self._measure(url, client, options)
+            self._report_line(name, results[name])
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.write_text(json.dumps({
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'cold': options['cold'],
+                'endpoints': results,
+            }, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; run with --save-baseline first'))
+            return
+        regressions = self._compare(json.loads(baseline_path.read_text())['endpoints'], results, options)
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} endpoint(s) regressed against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+
+    def _endpoints(self, search):
+        product = Product.objects.filter(is_active=True).order_by('-daily_sales__units_sold', '-id').first()
+        if product is None:
+            raise CommandError('No products found; run generate_dataset first')
+        category_id = product.category_id
+
+        anonymous = Client()
+        endpoints = [
+            ('home', reverse('home'), anonymous),
+            ('products_list', reverse('products_list'), anonymous),
+            ('products_list:category', f'{reverse("products_list")}?category={category_id}', anonymous),
+            ('products_list:price_low', f'{reverse("products_list")}?sort=price_low', anonymous),
+            ('products_list:price_high', f'{reverse("products_list")}?sort=price_high', anonymous),
+            ('products_list:name', f'{reverse("products_list")}?sort=name', anonymous),
+            ('products_list:search', f'{reverse("products_list")}?search={search}', anonymous),
+            ('products_list:search_sorted', f'{reverse("products_list")}?search={search}&sort=price_low', anonymous),
+            ('product_detail', reverse('product_detail', args=[product.id]), anonymous),
+        ]
+
+        # A customer with both an open cart and past orders
+        customer = User.objects.filter(
+            pk__in=Cart.objects.filter(items__isnull=False).values('user_id'),
+            orders__isnull=False,
+        ).first()
+        if customer is None:
+            self.stdout.write(self.style.WARNING('No customer with a cart and orders; skipping customer pages'))
+        else:
+            client = Client()
+            client.force_login(customer)
+            order = customer.orders.order_by('-created_at').first()
+            endpoints += [
+                ('cart_view', reverse('cart_view'), client),
+                ('checkout', reverse('checkout'), client),
+                ('orders_list', reverse('orders_list'), client),
+                ('order_detail', reverse('order_detail', args=[order.id]), client),
+            ]
+
+        staff = User.objects.filter(is_staff=True, is_active=True).order_by('pk').first()
+        if staff is None:
+            self.stdout.write(self.style.WARNING('No staff user; skipping admin pages'))
+        else:
+            client = Client()
+            client.force_login(staff)
+            endpoints += [
+                ('admin_dashboard', reverse('admin_dashboard'), client),
+                ('admin_orders', reverse('admin_orders'), client),
+                ('admin_orders:status', f'{reverse("admin_orders")}?status=Shipped', client),
+                ('admin_orders:search', f'{reverse("admin_orders")}?search={search}', client),
+            ]
+        return endpoints
+
+    def _measure(self, url, client, options):
+        def request():
+            if options['cold']:
+                cache.clear()
+                _active_categories.clear()
+            with QueryCounter() as counter:
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+            return elapsed * 1000, counter.count
+
+        for _ in range(options['warmup']):
+            request()
+        timings, queries = zip(*(request() for _ in range(options['iterations'])))
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'mean_queries': round(statistics.mean(queries), 2),
+            'max_queries': max(queries),
+        }
+
+    def _report_line(self, name, result):
+        self.stdout.write(
+            f'{name:<30} p50 {result["p50_ms"]:8.2f}ms  p95 {result["p95_ms"]:8.2f}ms  '
+            f'p99 {result["p99_ms"]:8.2f}ms  queries {result["mean_queries"]:6.2f} (max {result["max_queries"]})'
+        )
+
+    def _compare(self, baseline, results, options):
+        metric = options['metric']
+        key = f'{metric}_ms'
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            allowed = max(before[key] * (1 + options['tolerance']), before[key] + options['slack_ms'])
+            if result[key] > allowed:
+                regressions.append(
+                    f'{name}: {metric} {result[key]:.2f}ms, baseline {before[key]:.2f}ms (allowed {allowed:.2f}ms)'
+                )
+            if result['max_queries'] > before['max_queries']:
+                regressions.append(
+                    f'{name}: {result["max_queries"]} queries, baseline {before["max_queries"]}'
+                )
+        return regressions
@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from products.checkout import CheckoutError, place_order
+from products.instrumentation import percentile
+from products.models import Cart, CartItem, Category, OrderItem, Product
+
+
+SHIPPING = {
+    'shipping_name': 'Benchmark Customer',
+    'shipping_phone': '0000000000',
+    'shipping_address': 'Benchmark Street',
+    'shipping_city': 'Ahmedabad',
+    'shipping_state': 'Gujarat',
+    'shipping_pincode': '380015',
+}
+
+
+class Command(BaseCommand):
+    help = 'Run many parallel checkouts of one hot product and verify it is never oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=100, help='Starting stock of the hot product')
+        parser.add_argument('--customers', type=int, default=300, help='Number of competing checkouts')
+        parser.add_argument('--quantity', type=int, default=1, help='Units each customer tries to buy')
+        parser.add_argument('--workers', type=int, default=16, help='Parallel threads')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated benchmark data')
+
+    def handle(self, *args, **options):
+        stock = options['stock']
+        quantity = options['quantity']
+        category, product, users = self._setup(stock, options['customers'], quantity)
+
+        outcomes = {'ok': 0, 'out_of_stock': 0, 'error': 0}
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        # The pool starts no more threads than there are checkouts to run
+        start_gate = threading.Barrier(max(1, min(options['workers'], len(users))))
+
+        def checkout(user):
+            try:
+                started = time.perf_counter()
+                try:
+                    place_order(user, user.cart, SHIPPING)
+                    outcome = 'ok'
+                except CheckoutError:
+                    outcome = 'out_of_stock'
+                except Exception as e:
+                    outcome = 'error'
+                    with lock:
+                        errors.append(repr(e))
+                elapsed = time.perf_counter() - started
+                with lock:
+                    outcomes[outcome] += 1
+                    latencies.append(elapsed)
+            finally:
+                connection.close()
+
+        def wait_for_start():
+            try:
+                start_gate.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                # Start anyway rather than hang if a thread never arrives
+                pass
+
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers'], initializer=wait_for_start) as pool:
+                started = time.perf_counter()
+                list(pool.map(checkout, users))
+                elapsed = time.perf_counter() - started
+
+            product.refresh_from_db()
+            sold = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            self._report(options, outcomes, latencies, elapsed, product.stock, sold, errors)
+
+            if sold > stock or product.stock != stock - sold or sold != outcomes['ok'] * quantity:
+                raise CommandError(
+                    f'Inventory mismatch: started with {stock}, sold {sold}, {product.stock} left'
+                )
+        finally:
+            if not options['keep']:
+                User.objects.filter(pk__in=[user.pk for user in users]).delete()
+                category.delete()
+
+    def _setup(self, stock, customers, quantity):
+        run_id = int(time.time())
+        category = Category.objects.create(name=f'Benchmark {run_id}', is_active=False)
+        product = Product.objects.create(
+            name=f'Benchmark hot SKU {run_id}',
+            description='Generated by bench_inventory_contention',
+            price=100,
+            stock=stock,
+            category=category,
+            image='products/benchmark.jpg',
+            is_active=False,
+        )
+        User.objects.bulk_create(
+            User(username=f'bench-{run_id}-{i}', email=f'bench-{run_id}-{i}@example.com')
+            for i in range(customers)
+        )
+        users = list(User.objects.filter(username__startswith=f'bench-{run_id}-'))
+        Cart.objects.bulk_create(Cart(user=user) for user in users)
+        carts = Cart.objects.filter(user__in=users)
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=quantity) for cart in carts)
+        users = list(User.objects.filter(pk__in=[user.pk for user in users]).select_related('cart'))
+        return category, product, users
+
+    def _report(self, options, outcomes, latencies, elapsed, remaining, sold, errors):
+        def latency(p):
+            return percentile(latencies, p) * 1000
+
+        attempts = sum(outcomes.values())
+        self.stdout.write(f'Database:        {connection.vendor}')
+        self.stdout.write(f'Workers:         {options["workers"]}')
+        self.stdout.write(f'Checkouts:       {attempts} in {elapsed:.2f}s ({attempts / elapsed:.1f}/s)')
+        self.stdout.write(f'  succeeded:     {outcomes["ok"]}')
+        self.stdout.write(f'  out of stock:  {outcomes["out_of_stock"]}')
+        self.stdout.write(f'  errors:        {outcomes["error"]}')
+        self.stdout.write(f'Latency (ms):    p50 {latency(0.5):.1f}  p95 {latency(0.95):.1f}  p99 {latency(0.99):.1f}')
+        self.stdout.write(f'Stock:           started {options["stock"]}, sold {sold}, remaining {remaining}')
+        for error in sorted(set(errors))[:5]:
+            self.stdout.write(self.style.WARNING(f'  {error}'))
+        self.stdout.write(self.style.SUCCESS('No oversell detected') if sold <= options['stock'] else
+                          self.style.ERROR('Oversold!'))
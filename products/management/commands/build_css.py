@@ -0,0 +1,68 @@
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.stylesheet import unknown_classes
+
+
+TAILWIND_CONFIG = Path(settings.BASE_DIR) / 'tailwind.config.js'
+COMPONENT_CSS = Path(settings.BASE_DIR) / 'assets' / 'css' / 'site.css'
+BUNDLE = Path(settings.BASE_DIR) / 'static' / 'css' / 'app.css'
+
+
+def template_paths():
+    """Every template file the site renders, from the template dirs and the apps"""
+    roots = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    roots += sorted(Path(settings.BASE_DIR).glob('*/templates'))
+    return sorted({path for root in roots for path in root.rglob('*.html')})
+
+
+def run_tailwind():
+    """Build the bundle with the Tailwind CLI and return its CSS"""
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / 'app.css'
+        command = [
+            settings.TAILWIND_CLI, '--config', str(TAILWIND_CONFIG), '--input', str(COMPONENT_CSS),
+            '--output', str(output), '--minify',
+        ]
+        try:
+            subprocess.run(command, cwd=settings.BASE_DIR, check=True, capture_output=True, text=True)
+        except FileNotFoundError:
+            raise CommandError(
+                f'Tailwind CLI {settings.TAILWIND_CLI!r} not found; install the standalone executable '
+                'or point TAILWIND_CLI at it'
+            )
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f'Tailwind CLI failed:\n{e.stderr.strip()}')
+        return output.read_text(encoding='utf-8')
+
+
+class Command(BaseCommand):
+    help = 'Compile the CSS bundle from the classes used in the templates with the Tailwind CLI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Exit with an error if the bundle is out of date or a class is unknown, instead of writing it')
+
+    def handle(self, *args, **options):
+        css = run_tailwind()
+        current = BUNDLE.read_text(encoding='utf-8') if BUNDLE.exists() else None
+
+        unknown = unknown_classes(template_paths(), css)
+        for class_name, used_in in sorted(unknown.items()):
+            self.stderr.write(f'Unknown class {class_name} in {", ".join(map(str, sorted(used_in)))}')
+
+        if options['check']:
+            if unknown:
+                raise CommandError(f'{len(unknown)} class(es) are neither utilities nor defined in {COMPONENT_CSS}')
+            if css != current:
+                raise CommandError(f'{BUNDLE} is out of date; run manage.py build_css')
+            self.stdout.write(self.style.SUCCESS(f'{BUNDLE} is up to date'))
+            return
+
+        BUNDLE.parent.mkdir(parents=True, exist_ok=True)
+        BUNDLE.write_text(css, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {BUNDLE} ({len(css.encode()) / 1024:.1f} KB)'))
@@ -0,0 +1,71 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.models import Category, Product
+from products.renditions import RENDITION_ERRORS, build_renditions, save_renditions
+
+
+MODELS = {'product': Product, 'category': Category}
+
+
+def _init_worker():
+    django.setup()
+
+
+def _build(source):
+    try:
+        return source, build_renditions(source), None
+    except RENDITION_ERRORS as e:
+        return source, None, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Build resized JPEG and WebP renditions of product and category images in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help='Only build renditions for this model (repeatable)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument('--force', action='store_true', help='Rebuild renditions that are already current')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        built = failed = 0
+        for key in options['model'] or sorted(MODELS):
+            model = MODELS[key]
+            # Rows sharing an upload (common in generated datasets) are built once
+            pending = defaultdict(list)
+            rows = model.objects.exclude(image='').exclude(image__isnull=True).values_list(
+                'pk', 'image', 'image_renditions'
+            )
+            for pk, source, data in rows.iterator(chunk_size=2000):
+                if options['force'] or data.get('source') != source:
+                    pending[source].append(pk)
+            if not pending:
+                self.stdout.write(f'{key} images: renditions are current')
+                continue
+
+            self.stdout.write(f'{key} images: building {len(pending)}')
+            # Workers open their own connections; do not hand them this one
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                for source, data, error in pool.map(_build, sorted(pending), chunksize=4):
+                    if error:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f'  {source}: {error}'))
+                        continue
+                    save_renditions(model, source, data, pending[source])
+                    built += 1
+
+        elapsed = time.perf_counter() - started
+        message = f'Built renditions of {built} image(s) in {elapsed:.1f}s'
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{message}; {failed} could not be read'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,318 @@
+import random
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from products.cache import bump_catalog_version
+from products.models import Cart, CartItem, Category, Order, OrderItem, Payment, Product
+from products.navigation import invalidate_navigation
+from products.rollups import rebuild_rollups
+from products.search import get_order_search_backend, get_search_backend
+
+
+CATEGORY_NAMES = [
+    'Hair Care', 'Skin Care', 'Nail Care', "Men's Grooming", 'Body & Spa', 'Salon Equipment',
+    'Hair Colour', 'Makeup', 'Fragrance', 'Bridal', 'Tools & Brushes', 'Organic',
+]
+PRODUCT_ADJECTIVES = [
+    'Professional', 'Hydrating', 'Gentle', 'Intensive', 'Nourishing', 'Volumising', 'Repairing',
+    'Brightening', 'Soothing', 'Herbal', 'Keratin', 'Argan', 'Vitamin C', 'Charcoal', 'Rose',
+]
+PRODUCT_TYPES = [
+    'Shampoo', 'Conditioner', 'Hair Mask', 'Serum', 'Face Wash', 'Moisturizer', 'Toner',
+    'Nail Polish', 'Cuticle Oil', 'Beard Oil', 'Body Lotion', 'Scrub', 'Hair Dryer', 'Straightener',
+]
+CITIES = [
+    ('Ahmedabad', 'Gujarat'), ('Surat', 'Gujarat'), ('Mumbai', 'Maharashtra'), ('Pune', 'Maharashtra'),
+    ('Bengaluru', 'Karnataka'), ('Delhi', 'Delhi'), ('Jaipur', 'Rajasthan'), ('Chennai', 'Tamil Nadu'),
+]
+FIRST_NAMES = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vivaan', 'Diya', 'Kabir', 'Isha', 'Arjun', 'Meera']
+LAST_NAMES = ['Patel', 'Shah', 'Mehta', 'Sharma', 'Iyer', 'Reddy', 'Singh', 'Desai', 'Joshi', 'Nair']
+
+PAYMENT_METHODS = ['COD', 'UPI', 'CARD', 'NETBANKING']
+PAYMENT_METHOD_WEIGHTS = [40, 35, 15, 10]
+
+# Models whose auto_now_add dates are replaced by generated ones
+BACKDATED_FIELDS = [(Product, 'created_at'), (Order, 'created_at'), (Payment, 'created_at')]
+
+
+@contextmanager
+def backdating():
+    """Let bulk_create keep explicit created_at values instead of stamping now"""
+    fields = [model._meta.get_field(name) for model, name in BACKDATED_FIELDS]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of users, products, carts and orders at a configurable scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--max-items', type=int, default=5, help='Most distinct products in one order')
+        parser.add_argument('--carts', type=int, default=None, help='Users with an open cart (default: a quarter)')
+        parser.add_argument('--days', type=int, default=365, help='Spread orders over this many past days')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of product popularity; 0 makes every product equally popular')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--prefix', default='shopper', help='Username prefix of generated users')
+        parser.add_argument('--password', default='password123', help='Password given to every generated user')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f'Users named {options["prefix"]}* already exist; pass another --prefix')
+
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        started = time.perf_counter()
+
+        with backdating():
+            categories = self._categories(options['categories'])
+            products = self._products(options['products'], categories, options['days'])
+            users = self._users(options['users'], options['prefix'], options['password'])
+            popularity = self._popularity(len(products), options['skew'])
+            carts = options['carts'] if options['carts'] is not None else len(users) // 4
+            self._carts(users[:carts], products, popularity)
+            orders, items = self._orders(options['orders'], users, products, popularity,
+                                         options['max_items'], options['days'])
+
+        self._log('Rebuilding search indexes and sales rollups')
+        with transaction.atomic():
+            get_search_backend().rebuild()
+            get_order_search_backend().rebuild()
+        rebuild_rollups(batch_size=self.batch_size)
+        bump_catalog_version()
+        invalidate_navigation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(users)} users, {len(products)} products, {orders} orders '
+            f'and {items} order items in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def _log(self, message):
+        self.stdout.write(message)
+
+    def _categories(self, count):
+        categories = []
+        for i in range(count):
+            base = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+            name = base if i < len(CATEGORY_NAMES) else f'{base} {i // len(CATEGORY_NAMES) + 1}'
+            category, created = Category.objects.get_or_create(
+                name=name, defaults={'description': f'{name} products for salons and home use.'}
+            )
+            categories.append(category)
+        return categories
+
+    def _products(self, count, categories, days):
+        self._log(f'Creating {count} products')
+        rng = self.random
+
+        def rows():
+            for i in range(count):
+                price = Decimal(rng.randrange(199, 4999, 50))
+                discounted = rng.random() < 0.3
+                yield Product(
+                    name=f'{rng.choice(PRODUCT_ADJECTIVES)} {rng.choice(PRODUCT_TYPES)} {i + 1}',
+                    description=f'{rng.choice(PRODUCT_ADJECTIVES)} formula for everyday salon results.',
+                    price=price,
+                    discount_price=(price * Decimal('0.85')).quantize(Decimal('1')) if discounted else None,
+                    stock=rng.randrange(0, 200),
+                    category=rng.choice(categories),
+                    image='products/generated.jpg',
+                    is_featured=rng.random() < 0.05,
+                    is_active=rng.random() < 0.95,
+                    created_at=self.now - timedelta(days=rng.uniform(0, days + 30)),
+                )
+
+        products = []
+        for batch in batched(rows(), self.batch_size):
+            with transaction.atomic():
+                products.extend((p.pk, p.final_price) for p in Product.objects.bulk_create(batch))
+        return products
+
+    def _users(self, count, prefix, password):
+        self._log(f'Creating {count} users')
+        rng = self.random
+        password = make_password(password)
+
+        def rows():
+            for i in range(count):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                yield User(
+                    username=f'{prefix}{i}',
+                    email=f'{prefix}{i}@example.com',
+                    first_name=first,
+                    last_name=last,
+                    password=password,
+                    date_joined=self.now - timedelta(days=rng.uniform(0, 720)),
+                )
+
+        users = []
+        for batch in batched(rows(), self.batch_size):
+            with transaction.atomic():
+                for user in User.objects.bulk_create(batch):
+                    users.append((user.pk, user.username, user.email, f'{user.first_name} {user.last_name}'))
+        return users
+
+    def _popularity(self, count, skew):
+        """Cumulative Zipf weights, so a few best sellers get most of the orders"""
+        order = list(range(count))
+        self.random.shuffle(order)
+        weights = [0.0] * count
+        for rank, index in enumerate(order):
+            weights[index] = 1.0 / (rank + 1) ** skew
+        return list(accumulate(weights))
+
+    def _pick_products(self, products, popularity, count):
+        total = popularity[-1]
+        picked = set()
+        # Bounded retries, since popular products are drawn again and again
+        for _ in range(count * 4):
+            picked.add(min(bisect(popularity, self.random.random() * total), len(products) - 1))
+            if len(picked) >= count:
+                break
+        return [products[index] for index in picked]
+
+    def _carts(self, users, products, popularity):
+        self._log(f'Creating {len(users)} carts')
+        for batch in batched(users, self.batch_size):
+            with transaction.atomic():
+                carts = Cart.objects.bulk_create(Cart(user_id=user[0]) for user in batch)
+                CartItem.objects.bulk_create(
+                    CartItem(cart_id=cart.pk, product_id=product_id, quantity=self.random.randint(1, 3))
+                    for cart in carts
+                    for product_id, price in self._pick_products(products, popularity, self.random.randint(1, 4))
+                )
+
+    def _status(self, age_days):
+        """Older orders have mostly been delivered; recent ones are still moving"""
+        rng = self.random
+        if rng.random() < 0.06:
+            return 'Cancelled'
+        if age_days > 14:
+            return 'Delivered'
+        if age_days > 5:
+            return rng.choice(['Shipped', 'Delivered'])
+        if age_days > 1:
+            return rng.choice(['Confirmed', 'Processing', 'Shipped'])
+        return rng.choice(['Payment_Pending', 'Paid', 'Confirmed'])
+
+    def _order_number(self, sequence):
+        # An odd multiplier modulo 2**32 is a bijection, so numbers never repeat
+        # within a run while still looking random
+        return f'DD{(self._order_offset + sequence * 2654435761) % 2 ** 32:08X}'
+
+    def _orders(self, count, users, products, popularity, max_items, days):
+        self._log(f'Creating {count} orders')
+        rng = self.random
+        self._order_offset = rng.getrandbits(32)
+        order_total = item_total = 0
+        sequence = 0
+
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            orders, lines, customers = [], [], []
+            for _ in range(size):
+                user_id, username, email, name = rng.choice(users)
+                city, state = rng.choice(CITIES)
+                # Skewed towards recent days, as a growing shop would be
+                age_days = days * rng.random() ** 2
+                status = self._status(age_days)
+                picked = self._pick_products(products, popularity, rng.randint(1, max_items))
+                order_lines = [(product_id, rng.choice([1, 1, 1, 2, 3]), price) for product_id, price in picked]
+                sequence += 1
+                order = Order(
+                    user_id=user_id,
+                    order_number=self._order_number(sequence),
+                    status=status,
+                    shipping_name=name,
+                    shipping_phone=f'9{rng.randrange(10 ** 8, 10 ** 9)}',
+                    shipping_address=f'{rng.randint(1, 999)} MG Road',
+                    shipping_city=city,
+                    shipping_state=state,
+                    shipping_pincode=f'{rng.randint(110000, 699999)}',
+                    total_amount=sum(quantity * price for product_id, quantity, price in order_lines),
+                    created_at=self.now - timedelta(days=age_days),
+                    cancelled_at=self.now - timedelta(days=age_days * 0.9) if status == 'Cancelled' else None,
+                    is_cancellable=status not in ('Shipped', 'Delivered', 'Cancelled'),
+                )
+                orders.append(order)
+                lines.append(order_lines)
+                customers.append((username, email))
+
+            taken = set(Order.objects.filter(
+                order_number__in=[order.order_number for order in orders]
+            ).values_list('order_number', flat=True))
+            for order, (username, email) in zip(orders, customers):
+                while order.order_number in taken:
+                    sequence += 1
+                    order.order_number = self._order_number(sequence)
+                # Matches Order.build_search_text, which bulk_create bypasses
+                order.search_text = ' '.join([order.order_number, username, email, order.shipping_name]).lower()
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                items = [
+                    OrderItem(order_id=order.pk, product_id=product_id, quantity=quantity, price=price)
+                    for order, order_lines in zip(orders, lines)
+                    for product_id, quantity, price in order_lines
+                ]
+                OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                Payment.objects.bulk_create(
+                    self._payment(order) for order in orders if order.status != 'Payment_Pending'
+                )
+
+            order_total += len(orders)
+            item_total += len(items)
+            self._log(f'  {order_total} orders, {item_total} items')
+
+        return order_total, item_total
+
+    def _payment(self, order):
+        method = self.random.choices(PAYMENT_METHODS, PAYMENT_METHOD_WEIGHTS)[0]
+        if order.status == 'Cancelled':
+            status = 'Cancelled' if method == 'COD' else 'Refunded'
+        elif method == 'COD' and order.status != 'Delivered':
+            status = 'Pending'
+        else:
+            status = 'Success'
+        return Payment(
+            order_id=order.pk,
+            payment_method=method,
+            payment_status=status,
+            amount=order.total_amount,
+            transaction_id=None if method == 'COD' else f'TXN{order.order_number}',
+            payment_date=order.created_at if status == 'Success' else None,
+            created_at=order.created_at,
+            refund_status='Completed' if status == 'Refunded' else 'Not_Required',
+        )
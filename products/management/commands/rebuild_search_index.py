@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.search import get_order_search_backend, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index and the admin order search index'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        order_backend = get_order_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+            order_backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search indexes using {type(backend).__name__} and {type(order_backend).__name__}'
+        ))
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products.inventory import release_expired_reservations
+from products.mail import purge_sent_mail, send_queued_mail
+from products.models import Category, Product
+from products.renditions import refresh_stale_renditions
+
+
+class Command(BaseCommand):
+    help = ('Run the background jobs: deliver queued mail, build image renditions, release expired stock '
+            'reservations and purge sent mail')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages sent per connection')
+        parser.add_argument('--rendition-batch-size', type=int, default=10,
+                            help='Images given renditions per round')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when there is nothing to do')
+        parser.add_argument('--sweep-interval', type=float, default=60,
+                            help='Seconds between sweeps for expired stock reservations and old sent mail')
+        parser.add_argument('--once', action='store_true', help='Stop once there is nothing left to do')
+
+    def handle(self, *args, **options):
+        next_sweep = 0.0
+        try:
+            while True:
+                close_old_connections()
+                busy = False
+
+                sent, failed = send_queued_mail(batch_size=options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f'Mail: sent {sent}, failed {failed}')
+                    busy = True
+
+                refreshed = refresh_stale_renditions([Product, Category], limit=options['rendition_batch_size'])
+                if refreshed:
+                    self.stdout.write(f'Refreshed renditions of {refreshed} image(s)')
+                    busy = True
+
+                if time.monotonic() >= next_sweep:
+                    released = release_expired_reservations()
+                    if released:
+                        self.stdout.write(f'Released stock for {released} expired order(s)')
+                    purged = purge_sent_mail()
+                    if purged:
+                        self.stdout.write(f'Purged {purged} sent message(s)')
+                    next_sweep = time.monotonic() + options['sweep_interval']
+
+                if busy:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
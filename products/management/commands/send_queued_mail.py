@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox mail in batches over one reused connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages sent per connection')
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new mail')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when the outbox is empty')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                sent, failed = send_queued_mail(batch_size=options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Sent {total_sent} message(s), {total_failed} failed attempt(s)'))
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from products.fulfilment import ALLOWED_TRANSITIONS, TransitionError, transition_orders
+from products.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Move orders to a new status in one transaction, e.g. all Confirmed orders to Processing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('order_numbers', nargs='*', help='Order numbers to move')
+        parser.add_argument('--to', dest='status', required=True, choices=sorted(ALLOWED_TRANSITIONS),
+                            help='Status to move the orders to')
+        parser.add_argument('--from-status', choices=sorted(ALLOWED_TRANSITIONS),
+                            help='Move every order currently in this status')
+        parser.add_argument('--user', help='Username recorded as having made the change')
+        parser.add_argument('--note', default='', help='Note stored with each status change')
+
+    def handle(self, *args, **options):
+        order_numbers = [number.upper() for number in options['order_numbers']]
+        if not order_numbers and not options['from_status']:
+            raise CommandError('Give order numbers or --from-status')
+
+        changed_by = None
+        if options['user']:
+            try:
+                changed_by = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Unknown user {options["user"]}')
+
+        orders = Order.objects.all()
+        if order_numbers:
+            orders = orders.filter(order_number__in=order_numbers)
+        if options['from_status']:
+            orders = orders.filter(status=options['from_status'])
+        found = dict(orders.values_list('order_number', 'pk'))
+
+        try:
+            result = transition_orders(found.values(), options['status'], changed_by=changed_by,
+                                       note=options['note'][:200])
+        except TransitionError as e:
+            raise CommandError(str(e))
+
+        for number in order_numbers:
+            if number not in found:
+                result.fail(number, 'Order not found' if not options['from_status'] else
+                            f'Order not found in {options["from_status"]}')
+        for order_ref, reason in result.failures.items():
+            self.stdout.write(self.style.WARNING(f'{order_ref}: {reason}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {len(result.updated)} order(s) to {options["status"]}, {len(result.failures)} failed'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_order_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders_placed', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('payment_pending_orders', models.IntegerField(default=0)),
+                ('paid_orders', models.IntegerField(default=0)),
+                ('confirmed_orders', models.IntegerField(default=0)),
+                ('processing_orders', models.IntegerField(default=0)),
+                ('shipped_orders', models.IntegerField(default=0)),
+                ('delivered_orders', models.IntegerField(default=0)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('cod_payments', models.IntegerField(default=0)),
+                ('upi_payments', models.IntegerField(default=0)),
+                ('card_payments', models.IntegerField(default=0)),
+                ('netbanking_payments', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily product sales',
+                'unique_together': {('date', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-17 13:10
+
+from django.db import migrations, models
+
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE products_order_search USING fts5("
+    "search_text, tokenize = 'trigram')",
+    "INSERT INTO products_order_search (rowid, search_text) "
+    "SELECT id, search_text FROM products_order",
+]
+SQLITE_DROP = ["DROP TABLE IF EXISTS products_order_search"]
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX products_order_search_text_trgm "
+    "ON products_order USING GIN (search_text gin_trgm_ops)",
+]
+POSTGRES_DROP = ["DROP INDEX IF EXISTS products_order_search_text_trgm"]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def fill_search_text(apps, schema_editor):
+    Order = apps.get_model('products', 'Order')
+    batch = []
+    for order in Order.objects.select_related('user').iterator(chunk_size=1000):
+        order.search_text = ' '.join([
+            order.order_number, order.user.username, order.user.email, order.shipping_name,
+        ]).lower()
+        batch.append(order)
+        if len(batch) >= 1000:
+            Order.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    Order.objects.bulk_update(batch, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}),
+            run_for_vendor({'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}),
+        ),
+    ]
@@ -1,16 +1,28 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to="categories/", blank=True, null=True)
+    # Resized copies of image, written by products.renditions
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
+        # Active categories for the navigation menu and filters
+        indexes = [
+            models.Index(fields=['name'], condition=Q(is_active=True), name='category_active_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -24,9 +36,29 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     image = models.ImageField(upload_to="products/")
+    # Resized copies of image, written by products.renditions
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also moved by queryset updates such as stock changes
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # One index per storefront listing: the newest-first list, each sort
+        # mode and the category filter. These are partial indexes over active
+        # products because Django filters booleans as a bare WHERE "is_active",
+        # which a partial index matches but an index led by the flag does not.
+        # The last two serve the admin product list and low-stock counts.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=Q(is_active=True), name='product_active_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], condition=Q(is_active=True), name='product_active_cat_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True), name='product_active_price_idx'),
+            models.Index(fields=['name', 'id'], condition=Q(is_active=True), name='product_active_name_idx'),
+            models.Index(fields=['created_at'], condition=Q(is_featured=True, is_active=True), name='product_featured_idx'),
+            models.Index(fields=['created_at'], name='product_created_idx'),
+            models.Index(fields=['stock'], name='product_stock_idx'),
+        ]
 
     @property
     def final_price(self):
@@ -46,13 +78,33 @@ class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def summary(self):
+        """Item count, subtotal, payable total and savings in one aggregate query"""
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        # Mirrors Product.final_price: an empty or zero discount means full price
+        unit_price = Coalesce(NullIf('product__discount_price', Value(0)), 'product__price')
+        totals = self.items.aggregate(
+            items=Sum('quantity'),
+            subtotal=Sum(ExpressionWrapper(F('product__price') * F('quantity'), output_field=money)),
+            total=Sum(ExpressionWrapper(unit_price * F('quantity'), output_field=money)),
+        )
+        cents = Decimal('0.01')
+        subtotal = (totals['subtotal'] or Decimal('0')).quantize(cents)
+        total = (totals['total'] or Decimal('0')).quantize(cents)
+        return {
+            'items': totals['items'] or 0,
+            'subtotal': subtotal,
+            'total': total,
+            'savings': subtotal - total,
+        }
+
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.summary()['items']
 
     @property
     def total_amount(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.summary()['total']
 
     def __str__(self):
         return f"Cart for {self.user.username}"
@@ -86,6 +138,9 @@ class Order(models.Model):
         ('Delivered', 'Delivered'),
         ('Cancelled', 'Cancelled'),
     ]
+    
+    # Statuses whose totals count as revenue
+    REVENUE_STATUSES = ['Paid', 'Confirmed', 'Processing', 'Shipped', 'Delivered']
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     order_number = models.CharField(max_length=20, unique=True)
@@ -106,10 +161,44 @@ class Order(models.Model):
     cancelled_at = models.DateTimeField(blank=True, null=True)
     cancellation_reason = models.TextField(blank=True, null=True)
     is_cancellable = models.BooleanField(default=True)
+    
+    # Inventory reservation: stock is taken at checkout and held until the
+    # order is paid, or given back when it is cancelled or the hold expires
+    stock_reserved = models.BooleanField(default=False)
+    reserved_until = models.DateTimeField(blank=True, null=True)
+    
+    # Lowercased order number, username, email and shipping name, kept in
+    # one column so admin search is a single indexed lookup without joins
+    search_text = models.TextField(blank=True, default='', editable=False)
+    
+    # Fields whose values are copied into search_text
+    SEARCH_SOURCE_FIELDS = {'order_number', 'user', 'user_id', 'shipping_name'}
+
+    class Meta:
+        # Order history per customer, the admin list and its status and
+        # date filters, and the sweep for expired stock reservations
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            models.Index(fields=['reserved_until'], condition=Q(stock_reserved=True), name='order_reservation_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number}"
 
+    def build_search_text(self, user=None):
+        user = user or self.user
+        return ' '.join([self.order_number, user.username, user.email, self.shipping_name]).lower()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.SEARCH_SOURCE_FIELDS & set(update_fields):
+            self.search_text = self.build_search_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
+
     @classmethod
     def generate_order_number(cls):
         import uuid
@@ -154,6 +243,22 @@ class OrderItem(models.Model):
         return f"{self.product.name} x {self.quantity}"
 
 
+class OrderStatusChange(models.Model):
+    """Audit trail of order status transitions made by staff"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='order_status_changes')
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.order.order_number}: {self.from_status} -> {self.to_status}"
+
+
 class Payment(models.Model):
     PAYMENT_METHOD_CHOICES = [
         ('COD', 'Cash on Delivery'),
@@ -194,6 +299,15 @@ class Payment(models.Model):
     refund_completed_at = models.DateTimeField(blank=True, null=True)
     refund_expected_date = models.DateTimeField(blank=True, null=True)
     
+    class Meta:
+        # Admin payment list filters, each newest first
+        indexes = [
+            models.Index(fields=['created_at'], name='payment_created_idx'),
+            models.Index(fields=['payment_method', 'created_at'], name='payment_method_idx'),
+            models.Index(fields=['payment_status', 'created_at'], name='payment_status_idx'),
+            models.Index(fields=['refund_status', 'created_at'], name='payment_refund_idx'),
+        ]
+    
     def __str__(self):
         return f"Payment for {self.order.order_number}"
     
@@ -219,4 +333,82 @@ class Payment(models.Model):
         if self.refund_expected_date:
             return f"Expected refund date: {self.refund_expected_date.strftime('%B %d, %Y')}"
         
-        return "Refund timeline not available"
\ No newline at end of file
+        return "Refund timeline not available"
+
+
+class DailySalesRollup(models.Model):
+    """Per-day sales summary, keyed by the local date each order was placed"""
+    date = models.DateField(unique=True)
+    orders_placed = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Orders placed on this day, by their current status
+    pending_orders = models.IntegerField(default=0)
+    payment_pending_orders = models.IntegerField(default=0)
+    paid_orders = models.IntegerField(default=0)
+    confirmed_orders = models.IntegerField(default=0)
+    processing_orders = models.IntegerField(default=0)
+    shipped_orders = models.IntegerField(default=0)
+    delivered_orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    
+    # Payment method mix
+    cod_payments = models.IntegerField(default=0)
+    upi_payments = models.IntegerField(default=0)
+    card_payments = models.IntegerField(default=0)
+    netbanking_payments = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Sales for {self.date}"
+
+
+class DailyProductSales(models.Model):
+    """Units and revenue per product per day, counting revenue orders only"""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['date', 'product']
+        verbose_name_plural = "Daily product sales"
+
+    def __str__(self):
+        return f"{self.product.name} on {self.date}"
+
+
+class OutboundEmail(models.Model):
+    """Mail queued by request handlers and delivered by the send_queued_mail worker"""
+    STATUS_CHOICES = [
+        ('Queued', 'Queued'),
+        ('Sending', 'Sending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    # Cleared once the message is sent
+    body = models.TextField(blank=True)
+    is_html = models.BooleanField(default=False)
+    from_email = models.CharField(max_length=254)
+    # Comma separated recipient addresses
+    to = models.TextField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Queued')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # When a worker took the message for sending
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to}"
+
+    @property
+    def recipients(self):
+        return [address.strip() for address in self.to.split(',') if address.strip()]
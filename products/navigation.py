@@ -0,0 +1,26 @@
+from django.conf import settings
+
+from .cache import NAVIGATION_VERSION_KEY, LocalTTLCache, bump_version
+
+
+def _load_active_categories():
+    from .models import Category
+    return list(Category.objects.filter(is_active=True))
+
+
+_active_categories = LocalTTLCache(
+    NAVIGATION_VERSION_KEY,
+    _load_active_categories,
+    ttl=settings.NAVIGATION_CACHE_TTL,
+)
+
+
+def get_active_categories():
+    """Active categories for menus, the footer and category filters"""
+    return _active_categories.get()
+
+
+def invalidate_navigation():
+    """Reload navigation data here now and in other workers within one TTL"""
+    bump_version(NAVIGATION_VERSION_KEY)
+    _active_categories.clear()
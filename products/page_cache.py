@@ -0,0 +1,96 @@
+from functools import wraps
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Engine
+from django.template.context import make_context
+
+from .cache import catalog_cache_key, request_catalog_version
+
+
+def hole_marker(template_name, name):
+    return f'<!--hole:{template_name}#{name}-->'
+
+
+class HoleNode(template.Node):
+    """
+    Part of a page that depends on the visitor rather than the catalog.
+    Rendered in place normally; while a page shell is being rendered it
+    leaves a marker that is filled in for each request instead.
+    """
+
+    child_nodelists = ('nodelist',)
+
+    def __init__(self, name, nodelist):
+        self.name = name
+        self.nodelist = nodelist
+
+    def render(self, context):
+        holes = getattr(context.get('request'), '_page_holes', None)
+        if holes is None:
+            return self.nodelist.render(context)
+        hole = (self.origin.template_name, self.name)
+        if hole not in holes:
+            holes.append(hole)
+        return hole_marker(*hole)
+
+
+def fill_holes(request, content, holes):
+    """Render the holes of a page shell for this request and put them in place"""
+    by_template = {}
+    for template_name, name in holes:
+        by_template.setdefault(template_name, []).append(name)
+    context = make_context({}, request)
+    for template_name, names in by_template.items():
+        compiled = Engine.get_default().get_template(template_name)
+        nodes = {node.name: node for node in compiled.nodelist.get_nodes_by_type(HoleNode)}
+        with context.bind_template(compiled):
+            for name in names:
+                content = content.replace(hole_marker(template_name, name), nodes[name].nodelist.render(context))
+    return content
+
+
+def cached_page(*params):
+    """
+    Cache the page a catalog view renders under the catalog version.
+
+    The cache key covers the view arguments, the query parameters in params
+    (read the way the view reads them, so reordered or empty parameters
+    share an entry) and whether the visitor is signed in, which decides the
+    buttons on product cards. Everything specific to one visitor is in
+    {% hole %} blocks that are rendered for each request, so signed-in
+    customers share the page too. Pages that use a CSRF token are not
+    cached. Entries are stored under the catalog version read for the
+    request, the same one catalog_page builds its ETag from.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            query = tuple((param, request.GET[param]) for param in params if request.GET.get(param))
+            audience = 'customer' if request.user.is_authenticated else 'anonymous'
+            # The version the page's validators were made from, if any
+            key = catalog_cache_key(
+                f'page:{view.__name__}', settings.RELEASE_VERSION, args, sorted(kwargs.items()), query, audience,
+                version=request_catalog_version(request),
+            )
+            shell = cache.get(key)
+            if shell is not None:
+                content, content_type, holes = shell
+                return HttpResponse(fill_holes(request, content, holes), content_type=content_type)
+
+            request._page_holes = []
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                holes = request.__dict__.pop('_page_holes')
+            content = response.content.decode(response.charset)
+            if response.status_code == 200 and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                cache.set(key, (content, response['Content-Type'], holes), settings.CATALOG_CACHE_TIMEOUT)
+            response.content = fill_holes(request, content, holes)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,160 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps full microsecond precision for datetimes"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset"""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def encode_cursor(values, backwards=False):
+    """Encode the ordering values of a boundary row into an opaque token"""
+    payload = json.dumps([1 if backwards else 0, values], cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Decode a cursor token, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        backwards, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid cursor')
+    fields = [model._meta.get_field(name.lstrip('-')) for name in ordering]
+    try:
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except Exception:
+        raise ValueError('Invalid cursor')
+    # Orderings are over non-null columns, and None cannot be compared in SQL
+    if any(value is None for value in values):
+        raise ValueError('Invalid cursor')
+    return bool(backwards), values
+
+
+def _keyset_filter(ordering, values, backwards):
+    """Build a Q object selecting rows strictly after (or before) values"""
+    condition = Q()
+    for index, name in enumerate(ordering):
+        descending = name.startswith('-')
+        field = name.lstrip('-')
+        # Walking forwards through a descending column means smaller values
+        lookup = 'lt' if descending != backwards else 'gt'
+        step = Q(**{f'{field}__{lookup}': values[index]})
+        for previous_name, previous_value in zip(ordering[:index], values[:index]):
+            step &= Q(**{previous_name.lstrip('-'): previous_value})
+        condition |= step
+    return condition
+
+
+def _reverse_ordering(ordering):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+
+def _row_values(obj, ordering):
+    # Rows are model instances, or dicts from a .values() queryset
+    if isinstance(obj, dict):
+        return [obj[name.lstrip('-')] for name in ordering]
+    return [getattr(obj, name.lstrip('-')) for name in ordering]
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=24):
+    """
+    Return a KeysetPage of queryset ordered by ordering.
+
+    The last field in ordering must be unique (normally the primary key) so
+    that every row has a distinct position. Malformed cursors fall back to
+    the first page.
+    """
+    ordering = list(ordering)
+    backwards = False
+    if cursor:
+        try:
+            backwards, values = decode_cursor(cursor, queryset.model, ordering)
+        except ValueError:
+            cursor = None
+        else:
+            queryset = queryset.filter(_keyset_filter(ordering, values, backwards))
+
+    if backwards:
+        queryset = queryset.order_by(*_reverse_ordering(ordering))
+    else:
+        queryset = queryset.order_by(*ordering)
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(cursor)
+
+    if not rows:
+        return KeysetPage([], False, False)
+
+    return KeysetPage(
+        rows,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=encode_cursor(_row_values(rows[-1], ordering)) if has_next else None,
+        previous_cursor=encode_cursor(_row_values(rows[0], ordering), backwards=True) if has_previous else None,
+    )
+
+
+def paginate_sequence(items, cursor=None, per_page=24):
+    """
+    Return a KeysetPage over an in-memory sequence, such as ranked search
+    hits. The cursor holds the position of the first item of the page.
+    """
+    offset = 0
+    if cursor:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            offset = int(json.loads(base64.urlsafe_b64decode(padded.encode('ascii'))))
+        except (TypeError, ValueError, OverflowError, UnicodeError):
+            offset = 0
+        offset = min(max(offset, 0), len(items))
+
+    def position_cursor(position):
+        return base64.urlsafe_b64encode(str(position).encode('ascii')).decode('ascii').rstrip('=')
+
+    has_next = offset + per_page < len(items)
+    has_previous = offset > 0
+    return KeysetPage(
+        list(items[offset:offset + per_page]),
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=position_cursor(offset + per_page) if has_next else None,
+        previous_cursor=position_cursor(max(offset - per_page, 0)) if has_previous else None,
+    )
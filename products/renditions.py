@@ -0,0 +1,170 @@
+import hashlib
+import io
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.db.models.fields.json import KeyTextTransform
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version
+
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+
+# Rendition formats, in the order browsers should prefer them, and their file extensions
+FORMATS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+# Errors that mean an upload cannot be read, including images so large
+# that decoding them could exhaust memory
+RENDITION_ERRORS = (OSError, Image.DecompressionBombError)
+
+
+def rendition_name(source, digest, width, fmt):
+    """Storage name of one rendition; the digest changes whenever the image content does"""
+    stem = posixpath.splitext(source)[0]
+    return f'{RENDITIONS_DIR}/{stem}-{digest}-{width}w.{FORMATS[fmt]}'
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    quality = settings.IMAGE_RENDITION_QUALITY[fmt]
+    if fmt == 'jpeg':
+        if image.mode == 'RGBA':
+            # JPEG has no alpha channel: flatten transparent images onto white
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def build_renditions(source):
+    """
+    Write JPEG and WebP copies of the stored image `source` at each
+    IMAGE_RENDITION_WIDTHS width it can fill, and return the
+    description saved in image_renditions. Takes and returns plain data so
+    it can run in a worker process.
+    """
+    with default_storage.open(source, 'rb') as f:
+        content = f.read()
+    digest = hashlib.md5(content, usedforsecurity=False).hexdigest()[:8]
+
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    width, height = image.size
+    widths = [w for w in settings.IMAGE_RENDITION_WIDTHS if w < width]
+    if width <= max(settings.IMAGE_RENDITION_WIDTHS):
+        # Smaller than the largest width: keep a full-size copy instead of upscaling
+        widths.append(width)
+    data = {'source': source, 'digest': digest, 'width': width, 'height': height}
+    for fmt in FORMATS:
+        data[fmt] = []
+    for target in widths:
+        resized = image
+        if target != width:
+            resized = image.resize((target, max(1, round(height * target / width))),
+                                   Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in FORMATS:
+            name = rendition_name(source, digest, target, fmt)
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(_encode(resized, fmt)))
+            data[fmt].append([target, name])
+    return data
+
+
+def rendition_files(data):
+    return [name for fmt in FORMATS for _, name in data.get(fmt, [])]
+
+
+def delete_unused_renditions(model, data):
+    """Delete the files of a rendition set unless another row still shows them"""
+    if not data or model.objects.filter(
+        image=data['source'], image_renditions__digest=data['digest']
+    ).exists():
+        return
+    for name in rendition_files(data):
+        default_storage.delete(name)
+
+
+def save_renditions(model, source, data, pks):
+    """
+    Store data on the rows in pks that still show `source` and delete the
+    renditions they replaced. Returns the number of rows updated.
+    """
+    rows = model.objects.filter(pk__in=pks, image=source)
+    replaced = {
+        (old['source'], old['digest']): old
+        for old in rows.values_list('image_renditions', flat=True)
+        if old and (old['source'], old['digest']) != (source, data['digest'])
+    }
+    updated = rows.update(image_renditions=data, updated_at=timezone.now())
+    for old in replaced.values():
+        delete_unused_renditions(model, old)
+    if updated:
+        # Catalog pages are cached; re-render them with the new srcsets
+        bump_catalog_version()
+    return updated
+
+
+def refresh_renditions(model, pk):
+    """
+    Rebuild the renditions of one row, or drop them when it has no image.
+    An image that cannot be read is recorded so it is not retried.
+    """
+    row = model.objects.filter(pk=pk).values('image', 'image_renditions').first()
+    if row is None:
+        return
+    source, old = row['image'], row['image_renditions']
+    if not source:
+        if old:
+            model.objects.filter(pk=pk).update(image_renditions={}, updated_at=timezone.now())
+            delete_unused_renditions(model, old)
+        return
+    try:
+        data = build_renditions(source)
+    except RENDITION_ERRORS as e:
+        logger.warning('Could not build renditions of %s: %s', source, e)
+        data = {'source': source, 'digest': '', 'error': str(e)}
+    save_renditions(model, source, data, [pk])
+
+
+def stale_renditions(model):
+    """Rows whose renditions were not made from their current image"""
+    rows = model.objects.alias(rendition_source=KeyTextTransform('source', 'image_renditions'))
+    return rows.filter(
+        Q(rendition_source__isnull=True, image__gt='')
+        | Q(rendition_source__isnull=False) & ~Q(rendition_source=F('image'))
+    )
+
+
+def refresh_stale_renditions(models, limit=10):
+    """
+    Refresh up to limit rows of models whose renditions are stale, such as
+    new uploads, and return how many were refreshed. Run by the worker.
+    """
+    refreshed = 0
+    for model in models:
+        for pk in stale_renditions(model).order_by('pk').values_list('pk', flat=True)[:limit - refreshed]:
+            refresh_renditions(model, pk)
+            refreshed += 1
+        if refreshed >= limit:
+            break
+    return refreshed
+
+
+def renditions_stale(instance):
+    """True when a row's renditions were not made from its current image"""
+    source = instance.image.name if instance.image else ''
+    return instance.image_renditions.get('source', '') != source
@@ -0,0 +1,179 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySalesRollup, Order, OrderItem, Payment
+
+
+STATUS_FIELDS = {
+    'Pending': 'pending_orders',
+    'Payment_Pending': 'payment_pending_orders',
+    'Paid': 'paid_orders',
+    'Confirmed': 'confirmed_orders',
+    'Processing': 'processing_orders',
+    'Shipped': 'shipped_orders',
+    'Delivered': 'delivered_orders',
+    'Cancelled': 'cancelled_orders',
+}
+
+PAYMENT_METHOD_FIELDS = {
+    'COD': 'cod_payments',
+    'UPI': 'upi_payments',
+    'CARD': 'card_payments',
+    'NETBANKING': 'netbanking_payments',
+}
+
+LINE_REVENUE = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def rollup_date(order):
+    """The day an order is counted under: its local creation date"""
+    return timezone.localdate(order.created_at)
+
+
+def _apply_rollup_deltas(date, deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    DailySalesRollup.objects.get_or_create(date=date)
+    DailySalesRollup.objects.filter(date=date).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def _apply_product_deltas(date, product_id, units, revenue):
+    if not units and not revenue:
+        return
+    DailyProductSales.objects.get_or_create(date=date, product_id=product_id)
+    DailyProductSales.objects.filter(date=date, product_id=product_id).update(
+        units_sold=F('units_sold') + units,
+        revenue=F('revenue') + revenue,
+    )
+    if units < 0:
+        # rebuild_rollups keeps no row for a product with no sales that day
+        DailyProductSales.objects.filter(date=date, product_id=product_id, units_sold=0, revenue=0).delete()
+
+
+def record_status_changes(changes):
+    """
+    Apply [(order, old_status, new_status), ...] to the rollup tables.
+
+    old_status is None for a newly placed order and new_status is None for
+    a deleted one. Orders that move into or out of a revenue status add or
+    remove their total and their per-product sales.
+    """
+    revenue_statuses = set(Order.REVENUE_STATUSES)
+    rollup_deltas = defaultdict(Counter)
+    revenue_signs = {}
+
+    for order, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        deltas = rollup_deltas[rollup_date(order)]
+        if old_status is None:
+            deltas['orders_placed'] += 1
+        if new_status is None:
+            deltas['orders_placed'] -= 1
+        if old_status in STATUS_FIELDS:
+            deltas[STATUS_FIELDS[old_status]] -= 1
+        if new_status in STATUS_FIELDS:
+            deltas[STATUS_FIELDS[new_status]] += 1
+
+        was_revenue = old_status in revenue_statuses
+        is_revenue = new_status in revenue_statuses
+        if was_revenue != is_revenue:
+            sign = 1 if is_revenue else -1
+            deltas['revenue'] += sign * order.total_amount
+            revenue_signs[order.pk] = (rollup_date(order), sign)
+
+    product_deltas = defaultdict(lambda: [0, Decimal('0')])
+    if revenue_signs:
+        lines = OrderItem.objects.filter(order_id__in=revenue_signs).values('order_id', 'product_id').annotate(
+            units=Sum('quantity'), revenue=Sum(LINE_REVENUE)
+        )
+        for line in lines:
+            date, sign = revenue_signs[line['order_id']]
+            totals = product_deltas[(date, line['product_id'])]
+            totals[0] += sign * line['units']
+            totals[1] += sign * line['revenue']
+
+    if rollup_deltas or product_deltas:
+        transaction.on_commit(partial(_apply_deltas, dict(rollup_deltas), dict(product_deltas)))
+
+
+def _apply_deltas(rollup_deltas, product_deltas):
+    # Applied after the order commits, so concurrent checkouts do not queue
+    # on the lock of today's rollup row. A crash in between leaves the day
+    # short until rebuild_rollups runs.
+    with transaction.atomic():
+        for date, deltas in sorted(rollup_deltas.items()):
+            _apply_rollup_deltas(date, deltas)
+        for (date, product_id), (units, revenue) in sorted(product_deltas.items()):
+            _apply_product_deltas(date, product_id, units, revenue)
+
+
+def record_status_change(order, old_status, new_status):
+    record_status_changes([(order, old_status, new_status)])
+
+
+def record_payment(payment, sign=1):
+    """Count a payment towards the payment-method mix of its order's day"""
+    field = PAYMENT_METHOD_FIELDS.get(payment.payment_method)
+    if field:
+        transaction.on_commit(partial(_apply_deltas, {rollup_date(payment.order): {field: sign}}, {}))
+
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute both rollup tables from the full order history"""
+    revenue = Q(status__in=Order.REVENUE_STATUSES)
+    day = TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+
+    with transaction.atomic():
+        DailyProductSales.objects.all().delete()
+        DailySalesRollup.objects.all().delete()
+
+        order_totals = Order.objects.annotate(day=day).values('day').annotate(
+            orders_placed=Count('id'),
+            revenue=Sum('total_amount', filter=revenue),
+            **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+        ).order_by('day')
+        payment_mix = {
+            row.pop('day'): row
+            for row in Payment.objects.annotate(
+                day=TruncDate('order__created_at', tzinfo=timezone.get_current_timezone())
+            ).values('day').annotate(
+                **{field: Count('id', filter=Q(payment_method=method)) for method, field in PAYMENT_METHOD_FIELDS.items()}
+            ).order_by('day')
+        }
+
+        batch = []
+        for row in order_totals.iterator(chunk_size=batch_size):
+            date = row.pop('day')
+            row['revenue'] = row['revenue'] or 0
+            batch.append(DailySalesRollup(date=date, **row, **payment_mix.get(date, {})))
+            if len(batch) >= batch_size:
+                DailySalesRollup.objects.bulk_create(batch)
+                batch = []
+        DailySalesRollup.objects.bulk_create(batch)
+
+        product_sales = OrderItem.objects.filter(order__status__in=Order.REVENUE_STATUSES).annotate(
+            day=TruncDate('order__created_at', tzinfo=timezone.get_current_timezone())
+        ).values('day', 'product_id').annotate(
+            units_sold=Sum('quantity'), revenue=Sum(LINE_REVENUE)
+        ).order_by('day', 'product_id')
+
+        batch = []
+        for row in product_sales.iterator(chunk_size=batch_size):
+            batch.append(DailyProductSales(date=row['day'], product_id=row['product_id'],
+                                           units_sold=row['units_sold'], revenue=row['revenue']))
+            if len(batch) >= batch_size:
+                DailyProductSales.objects.bulk_create(batch)
+                batch = []
+        DailyProductSales.objects.bulk_create(batch)
+
+    return DailySalesRollup.objects.count(), DailyProductSales.objects.count()
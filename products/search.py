@@ -0,0 +1,281 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+# Upper bound on the number of ranked hits a single search returns, which
+# keeps the cost of a query flat however large the catalog grows. Searches
+# sorted by a column filter through the index with filter() instead.
+SEARCH_RESULT_LIMIT = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Split a user query into plain word tokens"""
+    return _TOKEN_RE.findall(query.lower())[:10]
+
+
+class BaseSearchBackend:
+    """Interface shared by all product search backends"""
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        """Return product ids matching query, best match first"""
+        raise NotImplementedError
+
+    def filter(self, products, query):
+        """Narrow the products queryset to every match for query, unranked"""
+        raise NotImplementedError
+
+    def index_products(self, products):
+        """Add or refresh the index entries for products"""
+
+    def remove_products(self, product_ids):
+        """Drop the index entries for product_ids"""
+
+    def rebuild(self):
+        """Rebuild the whole index from the product table"""
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed fallback for databases without full-text support"""
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        from .models import Product
+
+        products = self.filter(Product.objects.all(), query)
+        return list(products.order_by('-created_at').values_list('id', flat=True)[:limit])
+
+    def filter(self, products, query):
+        from django.db.models import Q
+
+        terms = search_terms(query)
+        if not terms:
+            return products.none()
+        for term in terms:
+            products = products.filter(
+                Q(name__icontains=term) |
+                Q(description__icontains=term) |
+                Q(category__name__icontains=term)
+            )
+        return products
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """SQLite FTS5 index ranked with bm25, used in development"""
+
+    table = 'products_product_fts'
+    # bm25 column weights for name, description and category
+    weights = (10.0, 1.0, 4.0)
+
+    def _match_expression(self, query):
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, %s, %s, %s) LIMIT %s',
+                [expression, *self.weights, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, products, query):
+        expression = self._match_expression(query)
+        if not expression:
+            return products.none()
+        return products.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [expression]
+        ))
+
+    def index_products(self, products):
+        rows = [(p.id, p.name, p.description, p.category.name) for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, description, category) VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description, category) '
+                'SELECT p.id, p.name, p.description, c.name '
+                'FROM products_product p JOIN products_category c ON c.id = p.category_id'
+            )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL tsvector index with a GIN index, used in production"""
+
+    table = 'products_product_search'
+    document_sql = (
+        "setweight(to_tsvector('english', p.name), 'A') || "
+        "setweight(to_tsvector('english', c.name), 'B') || "
+        "setweight(to_tsvector('english', p.description), 'C')"
+    )
+
+    def _tsquery(self, query):
+        return ' & '.join(f'{term}:*' for term in search_terms(query))
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        tsquery = self._tsquery(query)
+        if not tsquery:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT product_id FROM {self.table}, to_tsquery(\'english\', %s) query '
+                'WHERE document @@ query '
+                'ORDER BY ts_rank(document, query) DESC, product_id DESC LIMIT %s',
+                [tsquery, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, products, query):
+        tsquery = self._tsquery(query)
+        if not tsquery:
+            return products.none()
+        return products.filter(id__in=RawSQL(
+            f'SELECT product_id FROM {self.table} WHERE document @@ to_tsquery(\'english\', %s)', [tsquery]
+        ))
+
+    def _upsert(self, where_sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) '
+                f'SELECT p.id, {self.document_sql} '
+                'FROM products_product p JOIN products_category c ON c.id = p.category_id '
+                f'{where_sql} '
+                'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                params,
+            )
+
+    def index_products(self, products):
+        product_ids = [p.id for p in products]
+        if product_ids:
+            self._upsert('WHERE p.id = ANY(%s)', [product_ids])
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = ANY(%s)', [list(product_ids)])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        self._upsert('', [])
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the configured search backend, chosen by database vendor by default"""
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)()
+
+
+# Order numbers are DD followed by eight upper-case hex digits
+ORDER_NUMBER_RE = re.compile(r'DD[0-9A-F]{8}')
+
+
+class BaseOrderSearchBackend:
+    """
+    Admin order search over Order.search_text. The default implementation
+    is a substring scan of that one column, which needs no join.
+    """
+
+    def filter(self, orders, query):
+        """Narrow the orders queryset to those whose search text contains query"""
+        return orders.filter(search_text__contains=query.lower())
+
+    def index_orders(self, orders):
+        """Add or refresh the index entries for orders"""
+
+    def remove_orders(self, order_ids):
+        """Drop the index entries for order_ids"""
+
+    def rebuild(self):
+        """Rebuild the whole index from the order table"""
+
+
+class SQLiteOrderSearchBackend(BaseOrderSearchBackend):
+    """SQLite FTS5 trigram index, which answers substring matches"""
+
+    table = 'products_order_search'
+    # Shorter queries contain no trigram, so they fall back to a scan
+    min_length = 3
+
+    def filter(self, orders, query):
+        query = query.lower()
+        if len(query) < self.min_length:
+            return super().filter(orders, query)
+        phrase = '"%s"' % query.replace('"', '""')
+        return orders.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [phrase]
+        ))
+
+    def index_orders(self, orders):
+        rows = [(order.id, order.search_text) for order in orders]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, search_text) VALUES (%s, %s)', rows)
+
+    def remove_orders(self, order_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in order_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(f'INSERT INTO {self.table} (rowid, search_text) SELECT id, search_text FROM products_order')
+
+
+class PostgresOrderSearchBackend(BaseOrderSearchBackend):
+    """
+    PostgreSQL serves the substring scan from a pg_trgm GIN index on
+    search_text, so the column itself is the index and needs no upkeep.
+    """
+
+
+VENDOR_ORDER_BACKENDS = {
+    'sqlite': SQLiteOrderSearchBackend,
+    'postgresql': PostgresOrderSearchBackend,
+}
+
+
+def get_order_search_backend():
+    """Return the configured order search backend, chosen by database vendor by default"""
+    backend_path = getattr(settings, 'ORDER_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_ORDER_BACKENDS.get(connection.vendor, BaseOrderSearchBackend)()
+
+
+def search_orders(orders, query):
+    """Filter an orders queryset by an admin search query"""
+    query = query.strip()
+    if ORDER_NUMBER_RE.fullmatch(query.upper()):
+        # An exact order number goes straight through the unique index
+        return orders.filter(order_number=query.upper())
+    return get_order_search_backend().filter(orders, query)
@@ -0,0 +1,120 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import Category, Order, Payment, Product
+from .navigation import invalidate_navigation
+from .renditions import delete_unused_renditions
+from .rollups import record_payment, record_status_change
+from .search import get_order_search_backend, get_search_backend
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Drop cached catalog pages whenever a product or category changes"""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_menu(sender, **kwargs):
+    """Reload the shared category menu whenever a category changes"""
+    invalidate_navigation()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """Keep the search index current when a product is saved"""
+    if not raw:
+        get_search_backend().index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove_products([instance.id])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created=False, raw=False, **kwargs):
+    """Category names are indexed with each product, so refresh them on rename"""
+    if not raw and not created:
+        products = Product.objects.filter(category=instance).select_related('category')
+        get_search_backend().index_products(products.iterator())
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def delete_image_renditions(sender, instance, **kwargs):
+    if instance.image_renditions:
+        transaction.on_commit(partial(delete_unused_renditions, sender, instance.image_renditions))
+
+
+@receiver(post_save, sender=Order)
+def index_order(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the order search index current when searchable fields change"""
+    if not raw and (update_fields is None or 'search_text' in update_fields):
+        get_order_search_backend().index_orders([instance])
+
+
+@receiver(post_delete, sender=Order)
+def unindex_order(sender, instance, **kwargs):
+    get_order_search_backend().remove_orders([instance.id])
+
+
+@receiver(post_save, sender=User)
+def reindex_user_orders(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Usernames and emails are copied into order search text, so refresh them on change"""
+    if raw or created:
+        return
+    if update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    orders = list(Order.objects.filter(user=instance).only('id', 'order_number', 'shipping_name', 'search_text'))
+    changed = []
+    for order in orders:
+        search_text = order.build_search_text(user=instance)
+        if search_text != order.search_text:
+            order.search_text = search_text
+            changed.append(order)
+    if changed:
+        Order.objects.bulk_update(changed, ['search_text'], batch_size=500)
+        get_order_search_backend().index_orders(changed)
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred status fields are not fetched
+    instance._rollup_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def roll_up_order_status(sender, instance, created=False, raw=False, **kwargs):
+    """Keep the daily sales rollups current as orders are placed and move status"""
+    if raw:
+        return
+    old_status = None if created else instance._rollup_status
+    if old_status != instance.status:
+        record_status_change(instance, old_status, instance.status)
+    instance._rollup_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def roll_up_order_deletion(sender, instance, **kwargs):
+    record_status_change(instance, instance._rollup_status, None)
+
+
+@receiver(post_save, sender=Payment)
+def roll_up_payment(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        record_payment(instance)
+
+
+@receiver(pre_delete, sender=Payment)
+def roll_up_payment_deletion(sender, instance, **kwargs):
+    record_payment(instance, sign=-1)
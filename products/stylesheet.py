@@ -0,0 +1,51 @@
+"""
+Checks on the CSS bundle built by the Tailwind CSS standalone CLI.
+
+Tailwind silently skips class names it has no utility for, so a typo in a
+template only shows up as an unstyled page. unknown_classes() compares the
+classes in the templates with those the built bundle styles, which
+`manage.py build_css --check` reports.
+"""
+import re
+from pathlib import Path
+
+
+CLASS_ATTR_RE = re.compile(r'\bclass\s*=\s*(["\'])(.*?)\1', re.S)
+TEMPLATE_TAG_RE = re.compile(r'\{%.*?%\}', re.S)
+TEMPLATE_VARIABLE_RE = re.compile(r'\{\{.*?\}\}', re.S)
+EMBEDDED_RE = re.compile(r'<(style|script)\b.*?</\1>', re.S | re.I)
+CLASS_SELECTOR_RE = re.compile(r'\.((?:[A-Za-z0-9_-]|\\.)+)')
+
+# Classes that only mark an element for variants such as group-hover
+MARKER_CLASSES = {'group'}
+
+
+def class_selectors(css):
+    """The class names a stylesheet or script selects, unescaped"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    return {re.sub(r'\\(.)', r'\1', name) for name in CLASS_SELECTOR_RE.findall(css)}
+
+
+def unknown_classes(template_paths, bundle_css):
+    """
+    Map each class in the templates' class attributes that nothing styles
+    or selects to the templates using it. A class is known when the bundle
+    styles it, it is a marker, or a <style> or <script> in the templates
+    selects it. Classes built from a template variable cannot be checked
+    and are left out.
+    """
+    texts = {path: Path(path).read_text(encoding='utf-8') for path in template_paths}
+    known = class_selectors(bundle_css) | MARKER_CLASSES
+    for text in texts.values():
+        for block in EMBEDDED_RE.finditer(text):
+            known |= class_selectors(block.group(0))
+
+    unknown = {}
+    for path, text in texts.items():
+        for attr in CLASS_ATTR_RE.finditer(text):
+            value = TEMPLATE_VARIABLE_RE.sub('\0', TEMPLATE_TAG_RE.sub(' ', attr.group(2)))
+            for class_name in value.split():
+                if '\0' in class_name or class_name in known:
+                    continue
+                unknown.setdefault(class_name, set()).add(path)
+    return unknown
@@ -0,0 +1,20 @@
+from django import template
+
+from products.page_cache import HoleNode
+
+
+register = template.Library()
+
+
+@register.tag
+def hole(parser, token):
+    """
+    {% hole "name" %}...{% endhole %} marks visitor-specific markup, such as
+    the account menu, that cached pages render for each request
+    """
+    bits = token.split_contents()
+    if len(bits) != 2 or bits[1][0] not in '\'"' or bits[1][0] != bits[1][-1]:
+        raise template.TemplateSyntaxError(f'{bits[0]} takes one quoted name')
+    nodelist = parser.parse(('endhole',))
+    parser.delete_first_token()
+    return HoleNode(bits[1][1:-1], nodelist)
@@ -0,0 +1,37 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from products.renditions import renditions_stale
+
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in entries)
+
+
+@register.simple_tag
+def picture(obj, sizes, css_class='', alt='', lazy=True):
+    """
+    Render obj.image as a <picture> offering its WebP and JPEG renditions
+    through srcset, or as a plain <img> of the upload until they are built
+    or when the upload could not be read.
+    sizes is the rendered width, e.g. "64px" or "(min-width: 768px) 50vw, 100vw".
+    """
+    if not obj.image:
+        return ''
+    loading = 'lazy' if lazy else 'eager'
+    data = obj.image_renditions
+    if renditions_stale(obj) or 'error' in data:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}">',
+                           obj.image.url, alt, css_class, loading)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="{}" decoding="async"></picture>',
+        _srcset(data['webp']), sizes,
+        default_storage.url(data['jpeg'][-1][1]), _srcset(data['jpeg']), sizes,
+        data['width'], data['height'], alt, css_class, loading,
+    )
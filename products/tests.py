@@ -1,3 +1,1097 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from pathlib import Path
+from urllib.parse import urlsplit
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import conditional
+from .instrumentation import QueryCounter, query_budget
+from .cache import get_catalog_version
+from .cart import CART_COUNT_SESSION_KEY, count_cart_items
+from .checkout import place_order
+from .fulfilment import TransitionError, transition_orders
+from .inventory import (
+    InsufficientStock, confirm_reservation, release_expired_reservations, release_order_stock, reserve_stock,
+)
+from .mail import purge_sent_mail, queue_mail, send_queued_mail
+from .models import (
+    Cart, CartItem, Category, DailyProductSales, DailySalesRollup, Order, OrderItem, OrderStatusChange, OutboundEmail,
+    Payment, Product,
+)
+from .navigation import _active_categories, get_active_categories
+from .rollups import rebuild_rollups
+from .search import get_search_backend, search_orders
+from .renditions import refresh_stale_renditions, rendition_files
+from .management.commands import build_css
+from .stylesheet import unknown_classes
+
+
+# Plan lines that mean a whole table is read row by row. SQLite reports an
+# index-ordered scan as "SCAN t USING INDEX i", which is not matched.
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)\s*$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+def explain(sql):
+    """Return the query plan of sql as a list of lines"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Test tables are tiny, so make the planner show the index it would use
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+# The manifest storage only works after collectstatic, so pages rendered in
+# tests link to unhashed static files instead.
+TEST_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class CatalogTestData:
+    """A small catalog with a customer, a staff member and a few orders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Hair Care')
+        cls.other_category = Category.objects.create(name='Skin Care')
+        cls.products = [
+            Product.objects.create(
+                name=f'Shampoo {i}', description='Gentle daily shampoo', price=100 + i, stock=5 + i,
+                category=cls.category if i % 2 else cls.other_category, image='products/shampoo.jpg',
+                is_featured=i < 2,
+            )
+            for i in range(6)
+        ]
+        cls.customer = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.orders = []
+        for status in ['Payment_Pending', 'Confirmed', 'Shipped']:
+            order = Order.objects.create(
+                user=cls.customer, order_number=Order.generate_order_number(), status=status,
+                shipping_name='Priya Shah', shipping_phone='9999999999', shipping_address='1 MG Road',
+                shipping_city='Ahmedabad', shipping_state='Gujarat', shipping_pincode='380001',
+                total_amount=200,
+            )
+            OrderItem.objects.create(order=order, product=cls.products[0], quantity=1, price=100)
+            OrderItem.objects.create(order=order, product=cls.products[1], quantity=1, price=100)
+            Payment.objects.create(order=order, payment_method='UPI', amount=200)
+            cls.orders.append(order)
+        cart = Cart.objects.create(user=cls.customer)
+        for product in cls.products[1:4]:
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+    def setUp(self):
+        cache.clear()
+        _active_categories.clear()
+
+
+SHIPPING = {
+    'shipping_name': 'Priya Shah', 'shipping_phone': '9999999999', 'shipping_address': '1 MG Road',
+    'shipping_city': 'Ahmedabad', 'shipping_state': 'Gujarat', 'shipping_pincode': '380001',
+}
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Hair Care')
+        self.product = Product.objects.create(
+            name='Shampoo', description='Gentle', price=100, stock=5, category=category, image='products/shampoo.jpg'
+        )
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def test_checkout_reserves_stock(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = place_order(self.user, self.cart, SHIPPING)
+        self.assertTrue(order.stock_reserved)
+        self.assertIsNotNone(order.reserved_until)
+        self.assertEqual(self.stock(), 3)
+        # Still available, so cached catalog pages are kept
+        self.assertEqual(get_catalog_version(), version)
+
+        with self.assertRaises(InsufficientStock):
+            reserve_stock({self.product.id: 4})
+        self.assertEqual(self.stock(), 3)
+
+    def test_selling_out_and_restocking_refresh_the_catalog(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = place_order(self.user, self.cart, SHIPPING)
+        self.assertEqual(get_catalog_version(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock({self.product.id: 3})
+        self.assertEqual(self.stock(), 0)
+        sold_out = get_catalog_version()
+        self.assertNotEqual(sold_out, version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_order_stock(order)
+        self.assertEqual(self.stock(), 2)
+        self.assertNotEqual(get_catalog_version(), sold_out)
+
+    def test_checking_out_again_holds_stock_once(self):
+        first = place_order(self.user, self.cart, SHIPPING)
+        second = place_order(self.user, self.cart, SHIPPING)
+        self.assertEqual(self.stock(), 3)
+        first.refresh_from_db()
+        self.assertFalse(first.stock_reserved)
+        self.assertTrue(second.stock_reserved)
+
+        # Paying for the earlier order after all takes its stock again
+        confirm_reservation(first)
+        self.assertEqual(self.stock(), 1)
+
+    def test_failed_checkout_leaves_nothing_behind(self):
+        first = place_order(self.user, self.cart, SHIPPING)
+        self.assertEqual(self.stock(), 3)
+        with self.captureOnCommitCallbacks() as callbacks, transaction.atomic():
+            with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=RuntimeError('disk full')), \
+                    self.assertRaises(RuntimeError):
+                place_order(self.user, self.cart, SHIPPING)
+        # Neither a second order nor its items, and the first order still holds the stock
+        self.assertQuerySetEqual(Order.objects.all(), [first])
+        self.assertEqual(OrderItem.objects.filter(order__user=self.user).count(), 1)
+        self.assertEqual(self.stock(), 3)
+        first.refresh_from_db()
+        self.assertTrue(first.stock_reserved)
+        self.assertEqual(list(self.cart.items.values_list('product_id', 'quantity')), [(self.product.id, 2)])
+        self.assertEqual(callbacks, [])
+
+    def test_release_returns_stock(self):
+        order = place_order(self.user, self.cart, SHIPPING)
+        self.assertTrue(release_order_stock(order))
+        self.assertFalse(release_order_stock(order))
+        self.assertEqual(self.stock(), 5)
+
+    def test_expired_reservations_are_released_and_retaken_on_payment(self):
+        order = place_order(self.user, self.cart, SHIPPING)
+        self.assertEqual(release_expired_reservations(), 0)
+        Order.objects.filter(pk=order.pk).update(reserved_until=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(self.stock(), 5)
+
+        order.refresh_from_db()
+        confirm_reservation(order)
+        self.assertEqual(self.stock(), 3)
+        order.refresh_from_db()
+        self.assertTrue(order.stock_reserved)
+        self.assertIsNone(order.reserved_until)
+
+    def test_payment_fails_when_expired_stock_was_sold(self):
+        order = place_order(self.user, self.cart, SHIPPING)
+        Order.objects.filter(pk=order.pk).update(reserved_until=timezone.now() - timedelta(minutes=1))
+        release_expired_reservations()
+        reserve_stock({self.product.id: 4})
+        order.refresh_from_db()
+        with self.assertRaises(InsufficientStock):
+            confirm_reservation(order)
+        self.assertEqual(self.stock(), 1)
+
+
+class CartSummaryTests(TestCase):
+    def test_summary_matches_the_item_totals(self):
+        category = Category.objects.create(name='Hair Care')
+        user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cart = Cart.objects.create(user=user)
+        # No discount, a zero discount and a real one
+        for i, (price, discount_price, quantity) in enumerate([
+            (Decimal('100.50'), None, 3), (Decimal('80.00'), Decimal('0'), 2), (Decimal('99.99'), Decimal('89.99'), 1),
+        ]):
+            product = Product.objects.create(
+                name=f'Shampoo {i}', description='Gentle', price=price, discount_price=discount_price, stock=10,
+                category=category, image='products/shampoo.jpg',
+            )
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+
+        items = list(cart.items.select_related('product'))
+        subtotal = sum(item.product.price * item.quantity for item in items)
+        total = sum(item.total_price for item in items)
+        with self.assertNumQueries(1):
+            summary = cart.summary()
+        self.assertEqual(summary, {
+            'items': 6, 'subtotal': subtotal, 'total': total, 'savings': subtotal - total,
+        })
+        self.assertEqual(summary['total'], Decimal('551.49'))
+
+        cart.items.all().delete()
+        self.assertEqual(cart.summary(), {
+            'items': 0, 'subtotal': Decimal('0.00'), 'total': Decimal('0.00'), 'savings': Decimal('0.00'),
+        })
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Hair Care')
+        self.products = [
+            Product.objects.create(
+                name=f'Shampoo {i}', description='Gentle', price=100 + i, discount_price=90 if i else None,
+                stock=20, category=category, image='products/shampoo.jpg',
+            )
+            for i in range(3)
+        ]
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def buy(self, payment_method, *quantities):
+        cart, created = Cart.objects.get_or_create(user=self.user)
+        for product, quantity in zip(self.products, quantities):
+            if quantity:
+                CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        self.client.post(reverse('checkout'), SHIPPING)
+        order = Order.objects.filter(user=self.user).latest('id')
+        self.client.post(reverse('process_payment', args=[order.id]), {'payment_method': payment_method})
+        return order
+
+    def rollups(self):
+        return (
+            list(DailySalesRollup.objects.order_by('date').values(*[
+                field.name for field in DailySalesRollup._meta.fields if field.name != 'id'
+            ])),
+            list(DailyProductSales.objects.order_by('date', 'product_id').values('date', 'product_id', 'units_sold', 'revenue')),
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        # Deltas are applied once each change commits
+        with self.captureOnCommitCallbacks(execute=True):
+            paid = self.buy('UPI', 1, 2, 0)
+            cod = self.buy('COD', 0, 1, 3)
+            self.buy('CARD', 0, 0, 1)
+            self.client.post(reverse('cancel_order', args=[paid.id]), {'cancellation_reason': 'Changed my mind'})
+        paid.refresh_from_db()
+        cod.refresh_from_db()
+        self.assertEqual((paid.status, cod.status), ('Cancelled', 'Confirmed'))
+
+        incremental = self.rollups()
+        [day] = incremental[0]
+        self.assertEqual(
+            (day['orders_placed'], day['paid_orders'], day['confirmed_orders'], day['cancelled_orders']), (3, 1, 1, 1)
+        )
+        self.assertEqual((day['cod_payments'], day['upi_payments'], day['card_payments']), (1, 1, 1))
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), incremental)
+
+
+class OrderTransitionTests(CatalogTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def bulk_update(self, orders, status, note=''):
+        return self.client.post(reverse('bulk_update_order_status'), {
+            'order_ids': [order.id for order in orders], 'status': status, 'note': note,
+        })
+
+    def test_only_allowed_transitions_are_applied_and_audited(self):
+        pending, confirmed, shipped = self.orders
+        self.bulk_update([pending, confirmed, shipped], 'Processing', note='Packed')
+        statuses = dict(Order.objects.values_list('id', 'status'))
+        self.assertEqual(
+            [statuses[order.id] for order in self.orders], ['Payment_Pending', 'Processing', 'Shipped']
+        )
+        change = OrderStatusChange.objects.get()
+        self.assertEqual(
+            (change.order, change.from_status, change.to_status, change.changed_by, change.note),
+            (confirmed, 'Confirmed', 'Processing', self.staff, 'Packed'),
+        )
+
+        result = transition_orders([shipped.id, confirmed.id, 0], 'Processing')
+        self.assertEqual(result.updated, [])
+        self.assertEqual(result.failures, {
+            0: 'Order not found',
+            confirmed.order_number: 'Already Processing',
+            shipped.order_number: 'Cannot move from Shipped to Processing',
+        })
+        with self.assertRaises(TransitionError):
+            transition_orders([pending.id], 'Lost')
+        self.assertEqual(OrderStatusChange.objects.count(), 1)
+
+    def test_bulk_cancel_matches_a_customer_cancellation(self):
+        cart = Cart.objects.get(user=self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = place_order(self.customer, cart, SHIPPING)
+        self.assertTrue(order.can_be_cancelled())
+        stock = dict(Product.objects.values_list('id', 'stock'))
+
+        self.bulk_update([order], 'Cancelled', note='Out of delivery area')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'Cancelled')
+        self.assertFalse(order.is_cancellable)
+        self.assertIsNotNone(order.cancelled_at)
+        self.assertEqual(order.cancellation_reason, 'Out of delivery area')
+        self.assertFalse(order.stock_reserved)
+        for product in self.products[1:4]:
+            self.assertEqual(Product.objects.get(pk=product.pk).stock, stock[product.pk] + 1)
+        self.assertTrue(order.status_changes.filter(from_status='Payment_Pending', to_status='Cancelled').exists())
+        self.assertFalse(order.can_be_cancelled())
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AdminOrderListTests(CatalogTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('admin_orders'), params)
+        self.assertEqual(response.status_code, 200)
+        return {order.id for order in response.context['orders']}
+
+    def test_date_filters_cover_whole_local_days(self):
+        local = timezone.get_current_timezone()
+        first, last, next_day = self.orders
+        for order, moment in [
+            (first, datetime(2024, 3, 10, 0, 0)),
+            (last, datetime(2024, 3, 10, 23, 59, 59)),
+            (next_day, datetime(2024, 3, 11, 0, 0)),
+        ]:
+            Order.objects.filter(pk=order.pk).update(created_at=moment.replace(tzinfo=local))
+
+        self.assertEqual(self.listed(date_from='2024-03-10', date_to='2024-03-10'), {first.id, last.id})
+        self.assertEqual(self.listed(date_from='2024-03-11'), {next_day.id})
+        self.assertEqual(self.listed(date_to='2024-03-09'), set())
+
+    def test_impossible_dates_are_ignored(self):
+        everything = {order.id for order in self.orders}
+        for value in ['2024-02-30', '2024-13-01', 'yesterday']:
+            with self.subTest(value=value):
+                self.assertEqual(self.listed(date_from=value, date_to=value), everything)
+        # The day after the last representable one
+        self.assertEqual(self.listed(date_to='9999-12-31'), everything)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class OrderHistoryTests(CatalogTestData, TestCase):
+    def pages(self):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get('/orders/', {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page']
+            pages.append([order.id for order in page])
+            cursor = page.next_cursor
+            if not cursor:
+                return pages
+
+    def test_history_is_paged_newest_first(self):
+        for _ in range(9):
+            order = Order.objects.create(
+                user=self.customer, order_number=Order.generate_order_number(), total_amount=100, **SHIPPING
+            )
+            OrderItem.objects.create(order=order, product=self.products[2], quantity=1, price=100)
+        Order.objects.create(user=self.staff, order_number=Order.generate_order_number(), total_amount=100, **SHIPPING)
+        self.client.force_login(self.customer)
+
+        pages = self.pages()
+        expected = list(Order.objects.filter(user=self.customer).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual([len(page) for page in pages], [10, 2])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_query_count_does_not_grow_with_items(self):
+        self.client.force_login(self.customer)
+        self.client.get('/orders/')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/orders/')
+        for order in self.orders:
+            for product in self.products[2:]:
+                OrderItem.objects.create(order=order, product=product, quantity=2, price=100)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get('/orders/')
+        self.assertContains(response, 'Shampoo 5')
+        self.assertEqual(len(after), len(before))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', STORAGES=TEST_STORAGES)
+class OutboxTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('customer', 'customer@example.com', 'password')
+
+    def test_mail_is_queued_with_the_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            queue_mail('Rolled back', 'Body', ['customer@example.com'])
+            raise RuntimeError
+        self.assertFalse(OutboundEmail.objects.exists())
+
+        self.client.post(reverse('password_reset'), {'email': 'customer@example.com'})
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, 'Queued')
+        self.assertIn('/reset-password/', email.body)
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['customer@example.com'])
+        self.assertIn('/reset-password/', mail.outbox[0].body)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.body), ('Sent', 1, ''))
+        self.assertIsNotNone(email.sent_at)
+
+    def test_failures_back_off_then_fail(self):
+        email = queue_mail('Reset', 'Body', ['customer@example.com'])
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', side_effect=OSError('refused')), \
+                self.assertLogs('products.mail', 'WARNING'):
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('Queued', 1))
+            self.assertIn('refused', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+            # Not due again until the backoff has passed
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 0))
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.body), ('Failed', 2, 'Body'))
+        self.assertEqual(send_queued_mail(max_attempts=2), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_abandoned_claims_are_resent(self):
+        queue_mail('Reset', 'Body', ['customer@example.com'])
+        OutboundEmail.objects.update(status='Sending', claimed_at=timezone.now())
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutboundEmail.objects.update(claimed_at=timezone.now() - timedelta(minutes=settings.OUTBOX_CLAIM_MINUTES + 1))
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(OutboundEmail.objects.get().status, 'Sent')
+
+    def test_old_sent_mail_is_purged(self):
+        for subject in ['Old', 'Recent', 'Queued']:
+            queue_mail(subject, 'Body', ['customer@example.com'])
+        send_queued_mail(batch_size=2)
+        OutboundEmail.objects.filter(subject='Old').update(
+            sent_at=timezone.now() - timedelta(days=settings.OUTBOX_SENT_RETENTION_DAYS + 1)
+        )
+        self.assertEqual(purge_sent_mail(), 1)
+        self.assertQuerySetEqual(OutboundEmail.objects.order_by('pk'), ['Recent', 'Queued'], lambda e: e.subject)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class KeysetPaginationTests(CatalogTestData, TestCase):
+    def test_malformed_cursors_fall_back_to_the_first_page(self):
+        first_page = self.client.get('/products/?sort=price_low')
+        nulls = base64.urlsafe_b64encode(b'[0,[null,null]]').decode().rstrip('=')
+        short = base64.urlsafe_b64encode(b'[0,[1]]').decode().rstrip('=')
+        for cursor in [nulls, short, 'not-a-cursor', '%%%']:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/products/', {'sort': 'price_low', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [p.id for p in response.context['products']], [p.id for p in first_page.context['products']]
+                )
+                self.assertEqual(self.client.get('/api/products/', {'cursor': cursor}).status_code, 200)
+
+    def test_malformed_search_cursors_fall_back_to_the_first_page(self):
+        first_page = self.client.get('/products/?search=shampoo')
+        cursors = [base64.urlsafe_b64encode(value).decode().rstrip('=') for value in [b'1e999', b'NaN', b'[1]']]
+        for cursor in cursors + ['not-a-cursor']:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/products/', {'search': 'shampoo', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [p.id for p in response.context['products']], [p.id for p in first_page.context['products']]
+                )
+                api = self.client.get('/api/products/', {'search': 'shampoo', 'cursor': cursor})
+                self.assertEqual(api.status_code, 200)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class QueryPlanTests(CatalogTestData, TestCase):
+    """
+    EXPLAIN every query the hot pages run and fail when one of them falls
+    back to a full table scan.
+    """
+
+    def assertPageUsesIndexes(self, url, allow_scans=()):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        pattern = FULL_SCAN_PATTERNS[connection.vendor]
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(sql)
+            scanned = {match.group(1) for line in plan for match in [pattern.search(line)] if match}
+            scanned -= set(allow_scans)
+            self.assertFalse(scanned, f'{url} scans {", ".join(sorted(scanned))}:\n{sql}\n' + '\n'.join(plan))
+
+    def test_storefront_pages(self):
+        product = self.products[1]
+        for url in [
+            '/',
+            '/products/',
+            f'/products/?category={self.category.id}',
+            '/products/?sort=price_low',
+            f'/products/?sort=price_high&category={self.category.id}',
+            '/products/?sort=name',
+            '/products/?search=shampoo',
+            f'/products/{product.id}/',
+            f'/api/products/?sort=price_high&category={self.category.id}',
+            '/api/products/?sort=name&fields=id,name',
+            f'/api/products/{product.id}/',
+        ]:
+            with self.subTest(url=url):
+                self.assertPageUsesIndexes(url)
+
+    def test_order_history(self):
+        self.client.force_login(self.customer)
+        self.assertPageUsesIndexes('/orders/')
+
+    def test_admin_lists(self):
+        self.client.force_login(self.staff)
+        for url in [
+            '/admin-orders/',
+            '/admin-orders/?status=Shipped',
+            '/admin-orders/?date_from=2026-01-01&date_to=2026-12-31',
+            f'/admin-orders/?search={self.orders[0].order_number}',
+            '/admin-orders/?search=priya',
+            '/admin-payments/',
+            '/admin-payments/?refund=Pending',
+            '/admin-payments/?method=UPI',
+            '/admin-products/',
+            f'/admin-products/?category={self.category.id}',
+        ]:
+            with self.subTest(url=url):
+                self.assertPageUsesIndexes(url)
+
+    def test_admin_dashboard(self):
+        # The dashboard deliberately counts these small tables in full; the
+        # order table, which grows fastest, must still be read through indexes
+        self.client.force_login(self.staff)
+        self.assertPageUsesIndexes('/admin-dashboard/?refresh=1', allow_scans=[
+            'products_product', 'products_category', 'products_payment', 'auth_user',
+            'products_dailysalesrollup', 'products_dailyproductsales',
+        ])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class QueryBudgetTests(CatalogTestData, TestCase):
+    """
+    Hold every page to its QUERY_BUDGETS entry, measured with cold caches
+    and with several orders, order items and cart lines so N+1 queries show.
+    """
+
+    def assertWithinQueryBudget(self, url, user=None, data=None):
+        # A fresh session per page, so no page borrows another's cached state
+        self.client.logout()
+        if user:
+            self.client.force_login(user)
+        if data is not None:
+            # Forms are posted from a page, which caches the cart count in the session
+            self.client.get('/cart/')
+        cache.clear()
+        _active_categories.clear()
+        method = 'GET' if data is None else 'POST'
+        # Work deferred until commit still runs within the request
+        with QueryCounter() as counter, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(url) if data is None else self.client.post(url, data)
+        self.assertEqual(response.status_code, 200 if data is None else 302)
+        url_name = resolve(urlsplit(url).path).url_name
+        budget = query_budget(method, url_name)
+        self.assertIsNotNone(budget, f'No QUERY_BUDGETS entry for {method} {url_name}')
+        self.assertLessEqual(
+            counter.count, budget,
+            f'{method} {url} ran {counter.count} queries, over the {url_name} budget of {budget}:\n' +
+            '\n'.join(sql for sql, duration in counter.queries),
+        )
+
+    def test_storefront_pages(self):
+        urls = [
+            '/',
+            '/products/',
+            f'/products/?category={self.category.id}&sort=price_low',
+            '/products/?search=shampoo',
+            f'/products/{self.products[1].id}/',
+            '/api/categories/',
+            '/api/products/?sort=price_low',
+            '/api/products/?search=shampoo&fields=id,name',
+            f'/api/products/{self.products[1].id}/',
+        ]
+        for user in [None, self.customer]:
+            for url in urls:
+                with self.subTest(url=url, user=user):
+                    self.assertWithinQueryBudget(url, user)
+
+    def test_customer_pages(self):
+        order = self.orders[0]
+        for url in ['/cart/', '/checkout/', '/orders/', f'/orders/{order.id}/', '/profile/', f'/payment/{order.id}/']:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(url, self.customer)
+
+    def test_customer_forms(self):
+        cart_item = CartItem.objects.filter(cart__user=self.customer).first()
+        for url, data in [
+            (reverse('add_to_cart', args=[self.products[5].id]), {}),
+            (reverse('update_cart'), {'item_id': cart_item.id, 'quantity': 2}),
+            # Checks out the four lines left by the two posts above
+            (reverse('checkout'), SHIPPING),
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(url, self.customer, data)
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), 4)
+
+    def test_admin_pages(self):
+        for url in [
+            '/admin-dashboard/?refresh=1',
+            '/admin-orders/',
+            '/admin-orders/?search=priya',
+            '/admin-products/',
+            '/admin-payments/',
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(url, self.staff)
+
+    def test_costs_are_exposed_to_staff_only(self):
+        self.client.force_login(self.customer)
+        self.assertNotIn('X-Query-Count', self.client.get('/products/'))
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/products/')
+        self.assertIn('X-Query-Count', response)
+        self.assertEqual(response['X-Query-Budget'], str(settings.QUERY_BUDGETS['products_list']))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CatalogCacheTests(CatalogTestData, TestCase):
+    def test_product_and_category_saves_refresh_cached_pages(self):
+        product = self.products[0]
+        self.assertContains(self.client.get('/'), 'Shampoo 0')
+        # Writes that skip save() send no signal, so the cached page is served
+        Product.objects.filter(pk=product.pk).update(name='Renamed quietly')
+        self.assertNotContains(self.client.get('/'), 'Renamed quietly')
+
+        product.name = 'Argan Shampoo'
+        product.save()
+        self.assertContains(self.client.get('/'), 'Argan Shampoo')
+
+        self.other_category.name = 'Skin Rituals'
+        self.other_category.save()
+        self.assertContains(self.client.get('/products/'), 'Skin Rituals')
+
+        added = Product.objects.create(
+            name='Argan Serum', description='Frizz control', price=300, stock=3, category=self.category,
+            image='products/serum.jpg',
+        )
+        self.assertContains(self.client.get('/products/'), 'Argan Serum')
+        added.delete()
+        self.assertNotContains(self.client.get('/products/'), 'Argan Serum')
+
+    def test_category_saves_refresh_navigation(self):
+        def names():
+            return {category.name for category in get_active_categories()}
+
+        self.assertEqual(names(), {'Hair Care', 'Skin Care'})
+        Category.objects.filter(pk=self.category.pk).update(name='Hair Rituals')
+        self.assertEqual(names(), {'Hair Care', 'Skin Care'})
+
+        self.other_category.is_active = False
+        self.other_category.save()
+        self.assertEqual(names(), {'Hair Rituals'})
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CartBadgeTests(CatalogTestData, TestCase):
+    def badge(self):
+        return self.client.session.get(CART_COUNT_SESSION_KEY)
+
+    def test_badge_follows_cart_writes(self):
+        self.client.force_login(self.customer)
+        self.client.get('/cart/')
+        self.assertEqual(self.badge(), 3)
+
+        # A change made in another session is not seen until the cart is viewed
+        cart = Cart.objects.get(user=self.customer)
+        CartItem.objects.create(cart=cart, product=self.products[4], quantity=2)
+        self.client.get('/')
+        self.assertEqual(self.badge(), 3)
+        self.client.get('/cart/')
+        self.assertEqual(self.badge(), 5)
+
+        self.client.post(reverse('add_to_cart', args=[self.products[5].id]))
+        self.assertEqual(self.badge(), 6)
+        item = cart.items.get(product=self.products[4])
+        self.client.post(reverse('update_cart'), {'item_id': item.id, 'quantity': 5})
+        self.assertEqual(self.badge(), 9)
+        self.client.post(reverse('remove_from_cart', args=[item.id]))
+        self.assertEqual(self.badge(), 4)
+        self.assertEqual(count_cart_items(self.customer), 4)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ConditionalGetTests(CatalogTestData, TestCase):
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_page_is_not_modified(self):
+        for url in ['/', '/products/?sort=name', f'/products/{self.products[1].id}/', '/api/products/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Last-Modified', response)
+                # Answered from the cache alone
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_catalog_changes_move_the_validators(self):
+        url = f'/products/{self.products[1].id}/'
+        stale = self.client.get(url)
+        self.assertContains(stale, '(6 available)')
+        # Sold out by checkout
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock({self.products[1].id: 6})
+        fresh = self.revalidate(url, stale)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertContains(fresh, 'Out of Stock')
+        self.assertNotEqual(fresh['ETag'], stale['ETag'])
+        self.assertEqual(self.revalidate(url, fresh).status_code, 304)
+
+        self.products[5].delete()
+        self.assertEqual(self.revalidate(url, fresh).status_code, 200)
+
+    def test_errors_have_no_validators(self):
+        response = self.client.get('/products/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_pages_are_private_to_each_cart(self):
+        self.client.force_login(self.customer)
+        response = self.client.get('/')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.revalidate('/', response).status_code, 304)
+
+        # The cart badge moved and the "added to cart" message is pending
+        self.client.post(reverse('add_to_cart', args=[self.products[0].id]))
+        self.assertContains(self.revalidate('/', response), 'added to cart')
+
+        response = self.client.get('/')
+        self.client.logout()
+        self.assertEqual(self.revalidate('/', response).status_code, 200)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class PageCacheTests(CatalogTestData, TestCase):
+    def test_cached_page_skips_the_view(self):
+        url = f'/products/?sort=name&category={self.category.id}'
+        first = self.client.get(url)
+        second = self.client.get(f'/products/?category={self.category.id}&sort=name&utm_source=mail&search=')
+        self.assertEqual(first.content, second.content)
+        # Only the holes were rendered, not the page templates
+        self.assertEqual(second.templates, [])
+
+        Product.objects.filter(pk=self.products[1].pk).update(name='Renamed shampoo')
+        self.assertNotContains(self.client.get(url), 'Renamed shampoo')
+        self.products[1].name = 'Renamed shampoo'
+        self.products[1].save()
+        self.assertContains(self.client.get(url), 'Renamed shampoo')
+
+    def test_visitors_share_the_page_but_not_their_menus(self):
+        url = f'/products/{self.products[1].id}/'
+        self.client.force_login(self.customer)
+        self.assertContains(self.client.get(url), 'customer@example.com')
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertContains(response, 'staff@example.com')
+        self.assertContains(response, 'Admin Dashboard')
+        self.assertNotContains(response, 'customer@example.com')
+        self.assertNotContains(response, '<!--hole:')
+
+        self.client.logout()
+        response = self.client.get(url)
+        self.assertContains(response, 'Login to Buy')
+        self.assertNotContains(response, 'staff@example.com')
+
+    def test_page_is_stored_under_the_version_of_its_etag(self):
+        url = f'/products/{self.products[1].id}/'
+        validators = conditional._catalog_validators
+
+        def validators_then_sale(request):
+            # A sale commits after the validators were built but before the page is
+            result = validators(request)
+            with self.captureOnCommitCallbacks(execute=True):
+                reserve_stock({self.products[1].id: 6})
+            return result
+
+        with mock.patch.object(conditional, '_catalog_validators', validators_then_sale):
+            stale = self.client.get(url)
+        # The page went under the old version, so the new one renders afresh
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh.templates, [])
+        self.assertContains(fresh, 'Out of Stock')
+        self.assertNotEqual(fresh['ETag'], stale['ETag'])
+
+    def test_cart_badge_and_messages_are_current(self):
+        self.client.force_login(self.customer)
+        self.client.get('/')
+        self.client.post(reverse('add_to_cart', args=[self.products[0].id]))
+        response = self.client.get('/')
+        self.assertContains(response, 'added to cart')
+        self.assertRegex(response.content.decode(), r'animate-pulse">\s*4\s*<')
+        self.assertNotContains(self.client.get('/'), 'added to cart')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CatalogApiTests(CatalogTestData, TestCase):
+    def get_json(self, url):
+        response = self.client.get(url)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, json.loads(content)
+
+    def test_fields_are_projected(self):
+        status, data = self.get_json(f'/api/products/{self.products[1].id}/?fields=name,final_price,category_name')
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {'name': 'Shampoo 1', 'final_price': '101.00', 'category_name': 'Hair Care'})
+
+        status, data = self.get_json('/api/products/?fields=name,secret')
+        self.assertEqual(status, 400)
+        self.assertIn('secret', data['error'])
+
+        status, data = self.get_json('/api/categories/?fields=name')
+        self.assertEqual(data['results'], [{'name': 'Hair Care'}, {'name': 'Skin Care'}])
+
+    def test_malformed_numbers_are_rejected(self):
+        malformed = ['category=%C2%B2', 'category=abc', f'category={"9" * 30}', 'limit=%C2%B2', 'limit=0', 'limit=201']
+        for query in malformed:
+            with self.subTest(query=query):
+                status, data = self.get_json(f'/api/products/?{query}')
+                self.assertEqual(status, 400)
+                self.assertIn('error', data)
+        status, data = self.get_json(f'/api/products/?category={self.category.id}&limit=2')
+        self.assertEqual((status, len(data['results'])), (200, 2))
+
+    def test_cursor_walks_the_sorted_list(self):
+        hidden = self.products[3]
+        Product.objects.filter(pk=hidden.pk).update(is_active=False)
+        url = f'/api/products/?sort=price_high&category={self.category.id}&limit=1&fields=id'
+        seen, cursor = [], ''
+        while True:
+            status, data = self.get_json(f'{url}&cursor={cursor}')
+            self.assertEqual(status, 200)
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        expected = [p.id for p in reversed(self.products) if p.category == self.category and p != hidden]
+        self.assertEqual(seen, expected)
+
+        status, data = self.get_json(f'/api/products/{hidden.id}/')
+        self.assertEqual(status, 404)
+
+    def test_only_relevance_ordering_is_capped(self):
+        with mock.patch('products.views.SEARCH_RESULT_LIMIT', 2):
+            status, data = self.get_json('/api/products/?search=shampoo&fields=id')
+            self.assertEqual(len(data['results']), 2)
+            status, data = self.get_json('/api/products/?search=shampoo&sort=price_low&fields=id')
+            self.assertEqual([row['id'] for row in data['results']], [p.id for p in self.products])
+
+            self.assertContains(self.client.get('/products/?search=shampoo'), 'Showing 2 of 6 products')
+            self.assertContains(self.client.get('/products/?search=shampoo&sort=name'), 'Showing 6 of 6 products')
+            self.assertContains(self.client.get('/products/?search=gentle+nothing&sort=name'), 'No products found')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ProductSearchTests(CatalogTestData, TestCase):
+    def search(self, query):
+        return get_search_backend().search(query)
+
+    def test_index_follows_product_changes(self):
+        product = Product.objects.create(
+            name='Argan Serum', description='Frizz control', price=300, stock=3, category=self.category,
+            image='products/serum.jpg',
+        )
+        self.assertEqual(self.search('argan'), [product.id])
+        # Category names are indexed with the product
+        self.assertIn(product.id, self.search('hair care serum'))
+
+        product.name = 'Keratin Serum'
+        product.save()
+        self.assertEqual(self.search('argan'), [])
+        self.assertEqual(self.search('keratin'), [product.id])
+
+        self.category.name = 'Hair Treatments'
+        self.category.save()
+        self.assertEqual(self.search('treatments keratin'), [product.id])
+
+        product.delete()
+        self.assertEqual(self.search('keratin'), [])
+        self.assertEqual(get_search_backend().filter(Product.objects.all(), 'keratin').count(), 0)
+
+    def test_name_matches_rank_above_description_matches(self):
+        in_description = Product.objects.create(
+            name='Daily Conditioner', description='Pairs with any shampoo', price=150, stock=3,
+            category=self.category, image='products/conditioner.jpg',
+        )
+        hits = self.search('shampoo')
+        self.assertEqual(len(hits), 7)
+        self.assertEqual(hits[-1], in_description.id)
+        self.assertEqual(self.search('shampo'), hits)
+
+        response = self.client.get('/products/?search=shampoo')
+        self.assertEqual([p.id for p in response.context['products']], hits)
+
+
+class OrderSearchTests(CatalogTestData, TestCase):
+    def search(self, query):
+        return set(search_orders(Order.objects.all(), query).values_list('id', flat=True))
+
+    def test_orders_are_found_by_number_email_and_name(self):
+        first = self.orders[0]
+        everything = {order.id for order in self.orders}
+        self.assertEqual(self.search(first.order_number), {first.id})
+        self.assertEqual(self.search(f' {first.order_number.lower()} '), {first.id})
+        # Part of an order number goes through the index rather than the exact lookup
+        self.assertEqual(self.search(first.order_number[2:8]), {first.id})
+        self.assertEqual(self.search('customer@example'), everything)
+        self.assertEqual(self.search('PRIYA'), everything)
+        # Shorter than a trigram
+        self.assertEqual(self.search('sh'), everything)
+        self.assertEqual(self.search('nobody'), set())
+
+    def test_index_follows_order_changes(self):
+        order = self.orders[1]
+        order.shipping_name = 'Meera Iyer'
+        order.save(update_fields=['shipping_name'])
+        self.assertEqual(self.search('meera'), {order.id})
+        self.assertEqual(self.search('priya'), {self.orders[0].id, self.orders[2].id})
+
+        self.customer.email = 'priya.shah@example.com'
+        self.customer.save()
+        self.assertEqual(self.search('shah@example'), {o.id for o in self.orders})
+
+        order.delete()
+        self.assertEqual(self.search('meera'), set())
+        self.assertEqual(self.search(order.order_number[2:]), set())
+
+
+class ImageRenditionTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.category = Category.objects.create(name='Hair Care')
+
+    def upload(self, name, width, height):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), 'teal').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def render(self, product):
+        return Template('{% load images %}{% picture product "64px" "w-16 h-16" product.name %}').render(
+            Context({'product': product})
+        )
+
+    def test_worker_builds_renditions_of_uploads(self):
+        product = Product.objects.create(
+            name='Shampoo', description='Gentle', price=100, category=self.category,
+            image=self.upload('shampoo.png', 1200, 800),
+        )
+        self.assertEqual(refresh_stale_renditions([Product, Category]), 1)
+        self.assertEqual(refresh_stale_renditions([Product, Category]), 0)
+        product.refresh_from_db()
+        data = product.image_renditions
+        self.assertEqual(data['source'], product.image.name)
+        self.assertEqual([width for width, _ in data['webp']], settings.IMAGE_RENDITION_WIDTHS)
+        self.assertTrue(all(default_storage.exists(name) for name in rendition_files(data)))
+
+        html = self.render(product)
+        self.assertIn('<source type="image/webp" srcset="/media/renditions/products/', html)
+        self.assertIn(' 160w, ', html)
+        self.assertIn('sizes="64px"', html)
+
+    def test_replaced_image_drops_stale_renditions(self):
+        product = Product.objects.create(
+            name='Shampoo', description='Gentle', price=100, category=self.category,
+            image=self.upload('shampoo.png', 400, 300),
+        )
+        refresh_stale_renditions([Product])
+        product.refresh_from_db()
+        old_files = rendition_files(product.image_renditions)
+
+        product.image = self.upload('conditioner.png', 300, 200)
+        product.save()
+        # Until the new renditions are built the page shows the upload itself
+        self.assertIn(f'<img src="/media/{product.image.name}"', self.render(product))
+
+        refresh_stale_renditions([Product])
+        product.refresh_from_db()
+        self.assertEqual([width for width, _ in product.image_renditions['jpeg']], [160, 300])
+        self.assertFalse(any(default_storage.exists(name) for name in old_files))
+
+    def test_unreadable_images_are_not_retried(self):
+        category = Category.objects.create(name='Skin Care', image=self.upload('huge.png', 1200, 800))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), self.assertLogs('products.renditions', 'WARNING'):
+            self.assertEqual(refresh_stale_renditions([Category]), 1)
+        self.assertEqual(refresh_stale_renditions([Category]), 0)
+        category.refresh_from_db()
+        self.assertIn('decompression bomb', category.image_renditions['error'])
+        self.assertIn(f'<img src="/media/{category.image.name}"', self.render(category))
+
+
+@skipUnless(shutil.which(settings.TAILWIND_CLI), 'Tailwind CLI is not installed')
+class StylesheetBuildTests(TestCase):
+    def test_bundle_is_current(self):
+        # Fails when templates use classes missing from the committed bundle
+        call_command('build_css', '--check', stdout=io.StringIO())
+
+    def test_unknown_classes_fail_the_check(self):
+        with tempfile.TemporaryDirectory() as directory:
+            template = Path(directory) / 'promo.html'
+            template.write_text('<div class="px-4 bg-pink-500-typo">', encoding='utf-8')
+            paths = [*build_css.template_paths(), template]
+            with mock.patch.object(build_css, 'template_paths', lambda: paths), \
+                    self.assertRaisesMessage(CommandError, '1 class(es) are neither utilities'):
+                call_command('build_css', '--check', stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class StylesheetTests(TestCase):
+    def test_unknown_classes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            template = Path(directory) / 'promo.html'
+            template.write_text(
+                '<div class="group px-4 bg-pink-500 {% if on %}gold-accent{% endif %} alert-{{ tag }} hook">'
+                '<script>document.querySelector(".hook")</script>',
+                encoding='utf-8',
+            )
+            bundle = '.px-4{padding-left:1rem;padding-right:1rem}.gold-accent{color:#F0D890}'
+            self.assertEqual(unknown_classes([template], bundle), {'bg-pink-500': {template}})
+
+    def test_missing_cli_is_reported(self):
+        with override_settings(TAILWIND_CLI='/nonexistent/tailwindcss'), \
+                self.assertRaisesMessage(CommandError, 'Tailwind CLI'):
+            call_command('build_css', '--check', stdout=io.StringIO())
@@ -5,17 +5,31 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.db.models import Prefetch
 from django.utils import timezone
 import json
 import uuid
 
-from .models import Category, Product, Cart, CartItem, Order, OrderItem, Payment
+from .models import Product, Cart, CartItem, Order, OrderItem, Payment
+from .cache import cached_catalog
+from .cart import adjust_cart_count, get_cart_count, set_cart_count
+from .checkout import CheckoutError, place_order
+from .conditional import catalog_page
+from .inventory import InsufficientStock, confirm_reservation, release_order_stock
+from .navigation import get_active_categories
+from .page_cache import cached_page
+from .pagination import paginate_keyset, paginate_sequence
+from .search import SEARCH_RESULT_LIMIT, get_search_backend
 
 
+@catalog_page
+@cached_page()
 def home(request):
     """Home page with featured products and categories"""
-    featured_products = Product.objects.filter(is_featured=True, is_active=True)[:8]
-    categories = Category.objects.filter(is_active=True)[:6]
+    featured_products = cached_catalog('home_featured', (), lambda: list(
+        Product.objects.filter(is_featured=True, is_active=True).select_related('category')[:8]
+    ))
+    categories = get_active_categories()[:6]
     
     context = {
         'featured_products': featured_products,
@@ -24,34 +38,90 @@ def home(request):
     return render(request, 'home.html', context)
 
 
-def products_list(request):
-    """Products listing page with search and filter"""
+PRODUCTS_PER_PAGE = 24
+
+# Keyset orderings for each sort mode, ending with a unique tie-breaker
+PRODUCT_SORT_ORDERINGS = {
+    'price_low': ('price', 'id'),
+    'price_high': ('-price', '-id'),
+    'name': ('name', 'id'),
+}
+DEFAULT_PRODUCT_ORDERING = ('-created_at', '-id')
+
+
+def catalog_products(category_id='', product_ids=None, search=''):
+    """
+    Active products, optionally limited to a category, to product_ids and
+    to every match for search in the full-text index
+    """
     products = Product.objects.filter(is_active=True)
-    categories = Category.objects.filter(is_active=True)
     
-    # Search functionality
-    search = request.GET.get('search', '')
+    # Search results from the full-text index
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
     if search:
-        products = products.filter(name__icontains=search)
+        products = get_search_backend().filter(products, search)
     
     # Category filter
-    category_id = request.GET.get('category', '')
     if category_id:
         products = products.filter(category_id=category_id)
-    
-    # Sorting
+    return products
+
+
+def ranked_search_ids(search, category_id=''):
+    """
+    Ids of the active products matching search, best match first, up to
+    SEARCH_RESULT_LIMIT of them
+    """
+    def load():
+        matched_ids = get_search_backend().search(search, SEARCH_RESULT_LIMIT)
+        visible_ids = set(catalog_products(category_id, matched_ids).values_list('id', flat=True))
+        return [pk for pk in matched_ids if pk in visible_ids]
+    return cached_catalog('product_search', (search, category_id), load)
+
+
+@catalog_page
+@cached_page('search', 'category', 'sort', 'cursor')
+def products_list(request):
+    """Products listing page with search, filter and cursor pagination"""
+    search = request.GET.get('search', '')
+    category_id = request.GET.get('category', '')
     sort_by = request.GET.get('sort', '')
-    if sort_by == 'price_low':
-        products = products.order_by('price')
-    elif sort_by == 'price_high':
-        products = products.order_by('-price')
-    elif sort_by == 'name':
-        products = products.order_by('name')
+    cursor = request.GET.get('cursor', '')
+    
+    # Searches without an explicit sort are ordered by relevance
+    search_ids = ranked_search_ids(search, category_id) if search and not sort_by else None
+    
+    def load_ranked_page():
+        page = paginate_sequence(search_ids, cursor=cursor, per_page=PRODUCTS_PER_PAGE)
+        products = Product.objects.select_related('category').in_bulk(page.object_list)
+        page.object_list = [products[pk] for pk in page.object_list if pk in products]
+        return page
+    
+    def load_keyset_page():
+        return paginate_keyset(
+            catalog_products(category_id, search=search).select_related('category'),
+            PRODUCT_SORT_ORDERINGS.get(sort_by, DEFAULT_PRODUCT_ORDERING),
+            cursor=cursor,
+            per_page=PRODUCTS_PER_PAGE,
+        )
+    
+    load_page = load_keyset_page if search_ids is None else load_ranked_page
+    page = cached_catalog('products_list', (search, category_id, sort_by, cursor), load_page)
+    
+    if search_ids is not None and len(search_ids) < SEARCH_RESULT_LIMIT:
+        total_products = len(search_ids)
     else:
-        products = products.order_by('-created_at')
+        # Every match, though relevance ordering lists only the best ones
+        total_products = cached_catalog(
+            'products_count', (category_id, search), lambda: catalog_products(category_id, search=search).count()
+        )
+    categories = get_active_categories()
     
     context = {
-        'products': products,
+        'products': page,
+        'page': page,
+        'total_products': total_products,
         'categories': categories,
         'search': search,
         'selected_category': category_id,
@@ -60,6 +130,8 @@ def products_list(request):
     return render(request, 'products/list.html', context)
 
 
+@catalog_page
+@cached_page()
 def product_detail(request, product_id):
     """Product detail page"""
     product = get_object_or_404(Product, id=product_id, is_active=True)
@@ -127,11 +199,16 @@ def user_logout(request):
 def cart_view(request):
     """Cart page"""
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.all()
+    cart_items = cart.items.select_related('product__category')
+    cart_summary = cart.summary()
+    
+    # Resynchronise the badge in case the cart changed in another session
+    set_cart_count(request, cart_summary['items'])
     
     context = {
         'cart': cart,
         'cart_items': cart_items,
+        'cart_summary': cart_summary,
     }
     return render(request, 'cart/cart.html', context)
 
@@ -151,6 +228,7 @@ def add_to_cart(request, product_id):
     if not created:
         cart_item.quantity += 1
         cart_item.save()
+    adjust_cart_count(request, 1)
     
     messages.success(request, f'{product.name} added to cart')
     return redirect('products_list')
@@ -167,7 +245,9 @@ def update_cart(request):
             cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
             if quantity <= 0:
                 cart_item.delete()
+                adjust_cart_count(request, -cart_item.quantity)
             else:
+                adjust_cart_count(request, quantity - cart_item.quantity)
                 cart_item.quantity = quantity
                 cart_item.save()
         except CartItem.DoesNotExist:
@@ -182,6 +262,7 @@ def remove_from_cart(request, item_id):
     try:
         cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
         cart_item.delete()
+        adjust_cart_count(request, -cart_item.quantity)
         messages.success(request, 'Item removed from cart')
     except CartItem.DoesNotExist:
         pass
@@ -199,28 +280,11 @@ def checkout(request):
         return redirect('cart_view')
     
     if request.method == 'POST':
-        # Create order with payment pending status
-        order = Order.objects.create(
-            user=request.user,
-            order_number=Order.generate_order_number(),
-            shipping_name=request.POST.get('shipping_name'),
-            shipping_phone=request.POST.get('shipping_phone'),
-            shipping_address=request.POST.get('shipping_address'),
-            shipping_city=request.POST.get('shipping_city'),
-            shipping_state=request.POST.get('shipping_state'),
-            shipping_pincode=request.POST.get('shipping_pincode'),
-            total_amount=cart.total_amount,
-            status='Payment_Pending'
-        )
-        
-        # Create order items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.final_price
-            )
+        try:
+            order = place_order(request.user, cart, request.POST)
+        except CheckoutError as e:
+            messages.warning(request, str(e))
+            return redirect('cart_view')
         
         # Store order ID in session for payment (no need to store cart items)
         request.session['order_id'] = order.id
@@ -230,17 +294,31 @@ def checkout(request):
     
     context = {
         'cart': cart,
+        'cart_items': cart.items.select_related('product'),
+        'cart_summary': cart.summary(),
     }
     return render(request, 'cart/checkout.html', context)
 
 
+ORDERS_PER_PAGE = 10
+
+
 @login_required
 def orders_list(request):
-    """User orders list"""
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    """User orders list, paginated with items and products prefetched"""
+    orders = Order.objects.filter(user=request.user).prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+    )
+    page = paginate_keyset(
+        orders,
+        ('-created_at', '-id'),
+        cursor=request.GET.get('cursor'),
+        per_page=ORDERS_PER_PAGE,
+    )
     
     context = {
-        'orders': orders,
+        'orders': page,
+        'page': page,
     }
     return render(request, 'orders/list.html', context)
 
@@ -248,11 +326,15 @@ def orders_list(request):
 @login_required
 def order_detail(request, order_id):
     """Order detail page"""
+    orders = Order.objects.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product__category'))
+    )
+    
     # Allow admins to view any order, regular users can only view their own orders
     if request.user.is_staff:
-        order = get_object_or_404(Order, id=order_id)
+        order = get_object_or_404(orders, id=order_id)
     else:
-        order = get_object_or_404(Order, id=order_id, user=request.user)
+        order = get_object_or_404(orders, id=order_id, user=request.user)
     
     context = {
         'order': order,
@@ -273,12 +355,7 @@ def user_profile(request):
         total=Sum('total_amount')
     )['total'] or 0
     
-    # Get cart items count safely
-    try:
-        cart = Cart.objects.get(user=request.user)
-        cart_items_count = cart.total_items
-    except Cart.DoesNotExist:
-        cart_items_count = 0
+    cart_items_count = get_cart_count(request)
     
     context = {
         'user': request.user,
@@ -315,6 +392,14 @@ def process_payment(request, order_id):
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method')
         
+        if payment_method in dict(Payment.PAYMENT_METHOD_CHOICES):
+            # Keep the stock held at checkout, or take it again if the hold expired
+            try:
+                confirm_reservation(order)
+            except InsufficientStock:
+                messages.error(request, 'Sorry, some items in this order are no longer in stock.')
+                return redirect('order_detail', order_id=order.id)
+        
         if payment_method == 'COD':
             # Create payment record for COD
             payment = Payment.objects.create(
@@ -327,11 +412,12 @@ def process_payment(request, order_id):
             
             # Update order status to Confirmed (not Paid, since payment is on delivery)
             order.status = 'Confirmed'
-            order.save()
+            order.save(update_fields=['status'])
             
             # Clear cart
             cart, created = Cart.objects.get_or_create(user=request.user)
             cart.items.all().delete()
+            set_cart_count(request, 0)
             
             messages.success(request, f'Order confirmed! You will pay ₹{order.total_amount} on delivery.')
             return redirect('payment_success', order_id=order.id)
@@ -354,11 +440,12 @@ def process_payment(request, order_id):
             
             # Update order status
             order.status = 'Paid'
-            order.save()
+            order.save(update_fields=['status'])
             
             # Clear cart
             cart, created = Cart.objects.get_or_create(user=request.user)
             cart.items.all().delete()
+            set_cart_count(request, 0)
             
             messages.success(request, f'Payment successful! Transaction ID: {payment.transaction_id}')
             return redirect('payment_success', order_id=order.id)
@@ -405,7 +492,10 @@ def cancel_order(request, order_id):
         order.cancelled_at = timezone.now()
         order.cancellation_reason = cancellation_reason
         order.is_cancellable = False
-        order.save()
+        order.save(update_fields=['status', 'cancelled_at', 'cancellation_reason', 'is_cancellable'])
+        
+        # Put any stock held by the order back on sale
+        release_order_stock(order)
         
         # Initiate refund only if payment was made online (not COD)
         if hasattr(order, 'payment') and order.payment.payment_status == 'Success' and order.payment.payment_method != 'COD':
@@ -0,0 +1,8 @@
+// Read by the Tailwind CSS standalone CLI through `manage.py build_css`
+module.exports = {
+  content: ['./templates/**/*.html', './*/templates/**/*.html'],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};